@@ -1,35 +1,311 @@
-from flask import Flask, render_template, request, jsonify, current_app
-import pandas as pd
+import time
+_t_start = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, current_app, stream_with_context, g
 import numpy as np
-from stable_baselines3 import PPO
 from simulator import EmpiricalSimulator
-from env import CricketEnv
+from tables import load_tables
+from shared import open_artifact, export_state, import_state
+from pool import SimulatorPool, PoolBusy
+from inference import BatchedPredictor
+from numpy_policy import NumpyPolicy
+from policy_table import TablePolicy
+from projection import project_innings, model_policy, plan_policy, parse_overs, parse_plan, batting_order
+from planner import solve as solve_plan
+from utils import rss_mb, file_version
+from cache import ResultCache
+from metrics import Metrics, NULL_TIMER
+from response_format import columnar_innings, negotiate, encode
 import threading
 import traceback
+import atexit
+import json
 import os
+from contextlib import ExitStack
 
 app = Flask(__name__)
 
 DF_PATH = "processed/deliveries_processed.parquet"
+STORE_PATH = "processed/store"
 EMP_JSON = "processed/empirical_tables.json"
+EMP_TABLES = "processed/empirical_tables.npz"
 MODEL_PATH = "models/ppo_cricket.zip"
+POLICY_NPZ = "models/ppo_cricket_policy.npz"
+POLICY_TABLE = "models/ppo_policy_table.npz"
 MAPPINGS = "processed/mappings.json"
+MATCHUPS = "processed/matchup_tables.npz"
+MAX_ROLLOUTS = 50_000
+PROJECT_BUDGET_MS = float(os.environ.get("PROJECT_BUDGET_MS", 250)) or None
+POOL_SIZE = int(os.environ.get("SIM_POOL_SIZE", 4))
+QUEUE_SIZE = int(os.environ.get("SIM_QUEUE_SIZE", 16))
+QUEUE_TIMEOUT = float(os.environ.get("SIM_QUEUE_TIMEOUT", 30))
+INFER_MAX_BATCH = int(os.environ.get("INFER_MAX_BATCH", 64))
+INFER_MAX_WAIT_MS = float(os.environ.get("INFER_MAX_WAIT_MS", 2))
+CACHE_SIZE = int(os.environ.get("SIM_CACHE_SIZE", 256))
+CACHE_TTL = float(os.environ.get("SIM_CACHE_TTL", 600))
+TABLES_RELOAD_INTERVAL = float(os.environ.get("TABLES_RELOAD_INTERVAL", 5))
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") != "0"
+POLICY = os.environ.get("POLICY", "ppo")
+SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", os.cpu_count() or 1))
+SHARED_STATE = os.environ.get("SHARED_STATE", "processed/shared_state.bin")
+JOBS_DIR = os.environ.get("JOBS_DIR", "results/jobs")
+JOBS_MAX_RUNNING = int(os.environ.get("JOBS_MAX_RUNNING", 2))
+
+if not os.path.exists(EMP_TABLES) and not os.path.exists(EMP_JSON):
+    raise FileNotFoundError(f"{EMP_TABLES} and {EMP_JSON} missing")
+
+
+
+TABLES_PATH = EMP_TABLES if os.path.exists(EMP_TABLES) else EMP_JSON
+
+
+def _build_state():
+    from matchups import MatchupTables
+    return export_state(load_tables(TABLES_PATH, MAPPINGS),
+                        policy=NumpyPolicy.load(POLICY_NPZ) if os.path.exists(POLICY_NPZ) else None,
+                        matchups=MatchupTables.load(MATCHUPS) if os.path.exists(MATCHUPS) else None,
+                        policy_table=TablePolicy.load(POLICY_TABLE) if os.path.exists(POLICY_TABLE) else None)
+
+
+def _load_state():
+    """
+    Read-only serving state (see shared.import_state). With SHARED_STATE set, the tables,
+    policy weights, policy table and matchups are memory-mapped from one artifact file, so
+    every worker process shares the same pages and starts by mapping instead of parsing.
+    The artifact is rebuilt when any of its source files change; when it cannot be
+    written (read-only processed/), the state is built in this process instead.
+    state["artifact"] is (path, version) of the mapped file, or None. SHARED_STATE=""
+    loads only the tables here, and the rest from their own files on first use.
+    """
+    if not SHARED_STATE:
+        return {"tables": load_tables(TABLES_PATH, MAPPINGS), "artifact": None}
+    sources = [p for p in (TABLES_PATH, MAPPINGS, POLICY_NPZ, POLICY_TABLE, MATCHUPS) if os.path.exists(p)]
+    version = "+".join(file_version(p) for p in sources)
+    try:
+        art = open_artifact(SHARED_STATE, version, _build_state)
+    except OSError as e:
+        app.logger.warning("cannot write %s (%s); loading a private copy of the serving state", SHARED_STATE, e)
+        return dict(import_state(*_build_state()), artifact=None)
+    return dict(import_state(art.arrays, art.meta), artifact=(SHARED_STATE, art.version))
+
+
+_state = _load_state()
+_tables = (_state["tables"], file_version(TABLES_PATH))
+_tables_checked = time.monotonic()
+result_cache = ResultCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+metrics = Metrics(enabled=METRICS_ENABLED)
+
+# Everything below is built on first use so a new worker starts serving quickly.
+_lazy = {}
+_lazy_lock = threading.RLock()
+
+
+def _lazy_get(name, factory):
+    obj = _lazy.get(name)
+    if obj is None:
+        with _lazy_lock:
+            obj = _lazy.get(name)
+            if obj is None:
+                obj = _lazy[name] = factory()
+    return obj
+
+
+def current_tables():
+    """
+    (tables, version), reloaded when the tables file changes on disk, e.g. after
+    `data_prep.py update`. The file is stat'ed at most every TABLES_RELOAD_INTERVAL seconds.
+    """
+    global _state, _tables, _tables_checked
+    now = time.monotonic()
+    if now - _tables_checked >= TABLES_RELOAD_INTERVAL:
+        with _lazy_lock:
+            if now - _tables_checked >= TABLES_RELOAD_INTERVAL:
+                try:
+                    version = file_version(TABLES_PATH)
+                    if version != _tables[1]:
+                        _state = _load_state()
+                        _tables = (_state["tables"], version)
+                        app.logger.info("reloaded empirical tables (%s)", version)
+                except (OSError, ValueError) as e:
+                    app.logger.error("table reload failed: %s", e)
+                _tables_checked = now
+    return _tables
+
+
+def _load_deliveries():
+    """
+    Only needed when the tables carry no batting list: the memory-mapped delivery store
+    when built (see delivery_store.py), otherwise just the batsman column of the parquet.
+    """
+    if current_tables()[0].batsman_list:
+        return None
+    if os.path.exists(STORE_PATH):
+        from delivery_store import DeliveryStore
+        return DeliveryStore(STORE_PATH)
+    if not os.path.exists(DF_PATH):
+        raise FileNotFoundError(f"{DF_PATH} missing")
+    import pandas as pd
+    return pd.read_parquet(DF_PATH, columns=["batsman"])
+
+
+def _load_matchups():
+    """Batter-vs-bowler tables (data_prep.py --matchups) when built; None keeps (phase, bowler) outcomes."""
+    if "matchups" in _state:
+        return _state["matchups"]
+    if not os.path.exists(MATCHUPS):
+        return None
+    from matchups import MatchupTables
+    return MatchupTables.load(MATCHUPS)
+
+
+def _make_simulator():
+    from env import CricketEnv
+    sim = EmpiricalSimulator(_lazy_get("df", _load_deliveries), current_tables()[0],
+                             matchups=_lazy_get("matchups", _load_matchups))
+    return sim, CricketEnv(sim)
+
+
+def _load_model():
+    """Prefer the torch-free export (see export_policy.py); fall back to the SB3 checkpoint."""
+    if _state.get("policy") is not None:
+        return _state["policy"]
+    if os.path.exists(POLICY_NPZ):
+        return NumpyPolicy.load(POLICY_NPZ)
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"{POLICY_NPZ} and {MODEL_PATH} missing")
+    from stable_baselines3 import PPO
+    return PPO.load(MODEL_PATH)
+
+
+def _load_policy():
+    """The distilled lookup table (see policy_table.py) when present, with the model for uncovered cells."""
+    model = _load_model()
+    if _state.get("policy_table") is not None:
+        table = _state["policy_table"]
+        table.fallback = model
+        return table
+    if os.path.exists(POLICY_TABLE):
+        return TablePolicy.load(POLICY_TABLE, fallback=model)
+    return model
+
+
+def get_dp_policy():
+    """DP bowling plan (planner.py) for the current tables; re-solved in a few ms after a reload."""
+    tables, version = current_tables()
+    return _lazy_get(f"dp:{version}", lambda: solve_plan(tables))
+
+
+def model_version():
+    if POLICY == "dp":
+        return f"dp:{current_tables()[1]}"
+    return _lazy_get("model_version", lambda: "+".join(
+        file_version(p) for p in (POLICY_NPZ if os.path.exists(POLICY_NPZ) else MODEL_PATH, POLICY_TABLE)
+        if os.path.exists(p)))
+
+
+def get_pool():
+    return _lazy_get("pool", lambda: SimulatorPool(_make_simulator, size=POOL_SIZE,
+                                                   max_waiting=QUEUE_SIZE, timeout=QUEUE_TIMEOUT))
+
+
+def get_model():
+    if POLICY == "dp":
+        return get_dp_policy()
+    return _lazy_get("model", _load_policy)
+
+
+def get_predictor():
+    if POLICY == "dp":
+        return get_dp_policy()
+    return _lazy_get("predictor", lambda: BatchedPredictor(get_model(), max_batch_size=INFER_MAX_BATCH,
+                                                           max_wait_ms=INFER_MAX_WAIT_MS))
+
+
+_sweep = {"runner": None, "version": None, "artifact": None}
+
+
+def get_sweep_runner():
+    """
+    Process pool for /sweep, sharing the current tables, the exported PPO weights and the
+    matchup tables with its workers; they map the SHARED_STATE artifact when there is one.
+    Rebuilt when the tables or the artifact change, or when a dead worker broke the pool;
+    the old pool drains in the background.
+    """
+    with _lazy_lock:
+        tables, version = current_tables()
+        old = _sweep["runner"]
+        stale = (_sweep["version"], _sweep["artifact"]) != (version, _state["artifact"])
+        if old is None or old.broken or stale:
+            from sweep import SweepRunner
+            policy = _state.get("policy")
+            if policy is None and os.path.exists(POLICY_NPZ):
+                policy = NumpyPolicy.load(POLICY_NPZ)
+            _sweep["runner"] = SweepRunner(tables, policy, _lazy_get("matchups", _load_matchups),
+                                           workers=SWEEP_WORKERS, artifact=_state["artifact"], version=version)
+            _sweep["version"], _sweep["artifact"] = version, _state["artifact"]
+            if old is not None:
+                threading.Thread(target=old.close, daemon=True).start()
+        return _sweep["runner"]
+
+
+@atexit.register
+def _close_sweep_runner():
+    if _sweep["runner"] is not None:
+        _sweep["runner"].close()
+
+
+def get_jobs():
+    """Job queue for long sweeps; jobs left unfinished by a previous process resume on first use."""
+    from jobs import JobQueue
+    return _lazy_get("jobs", lambda: JobQueue(get_sweep_runner, JOBS_DIR, max_running=JOBS_MAX_RUNNING))
+
+
+metrics.gauge("pool_in_use", "Simulators currently handed out.",
+              lambda: get_pool().in_use() if "pool" in _lazy else 0)
+metrics.counter("cache_lookups", "Result cache lookups by outcome.",
+              lambda: {(("result", k),): result_cache.stats()[k] for k in ("hits", "misses")})
+metrics.gauge("policy_table_hit_rate", "Share of observations answered by the policy lookup table.",
+              lambda: get_model().stats()["hit_rate"] if isinstance(_lazy.get("model"), TablePolicy) else 0)
+metrics.counter("inference_batches", "Forward passes run by the batched predictor.",
+              lambda: get_predictor().stats()["batches"] if "predictor" in _lazy else 0)
+
+
+def _respond(payload, status=200):
+    """
+    payload as JSON, or as msgpack when the Accept header asks for it (and msgpack is
+    installed), compressed with brotli or gzip as allowed by Accept-Encoding.
+    """
+    mimetype, encoding = negotiate(request.accept_mimetypes, request.accept_encodings)
+    body, headers = encode(payload, mimetype, encoding)
+    return Response(body, status=status, headers=headers)
+
+
+def _innings_payload(result, body):
+    """/simulate_ajax result in the requested layout: "format": "columnar" (body or query) or the default rows."""
+    if (body.get("format") or request.args.get("format")) == "columnar":
+        return columnar_innings(result)
+    return result
 
-if not os.path.exists(DF_PATH):
-    raise FileNotFoundError(f"{DF_PATH} missing")
 
-if not os.path.exists(EMP_JSON):
-    raise FileNotFoundError(f"{EMP_JSON} missing")
+@app.before_request
+def _start_timer():
+    g.timer = metrics.timer()
 
-df = pd.read_parquet(DF_PATH)
-sim = EmpiricalSimulator(df, EMP_JSON, mappings_path=MAPPINGS)
-env = CricketEnv(sim)
 
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"{MODEL_PATH} missing")
-model = PPO.load(MODEL_PATH)
+@app.after_request
+def _record_timer(resp):
+    timer = g.get("timer", NULL_TIMER)
+    if timer is NULL_TIMER or resp.is_streamed:
+        return resp
+    if SERVER_TIMING:
+        resp.headers["Server-Timing"] = timer.server_timing()
+    metrics.record(request.endpoint, timer, resp.status_code)
+    return resp
 
-_simulate_lock = threading.Lock()
+
+STARTUP = {"startup_ms": round((time.perf_counter() - _t_start) * 1000, 1), "rss_mb": round(rss_mb(), 1)}
+print(f"App ready in {STARTUP['startup_ms']} ms, RSS {STARTUP['rss_mb']} MB")
 
 @app.route("/")
 def index():
@@ -38,140 +314,369 @@ def index():
 
 @app.route("/simulate_ajax", methods=["POST"])
 def simulate_ajax():
-    acquired = _simulate_lock.acquire(blocking=False)
-    if not acquired:
-        return jsonify({"error": "busy", "message": "Simulation already running. Please wait."}), 409
+    body = request.get_json(silent=True) or {}
+    try:
+        seed = body.get("seed")
+        key = None
+        if seed is not None:
+            seed = int(seed)
+            order = body.get("batting_order")
+            key = (str(body.get("batting_team", "TeamA")), tuple(order) if isinstance(order, list) else None,
+                   seed, model_version(), current_tables()[1])
+            cached = result_cache.get(key)
+            if cached is not None:
+                resp = _respond(_innings_payload(cached, body))
+                resp.headers["X-Cache"] = "HIT"
+                return resp
+
+        timer = g.timer
+        t0 = time.perf_counter()
+        with get_pool().acquire() as (sim, env), get_predictor().session():
+            timer.add("queue_wait", time.perf_counter() - t0)
+            result = _simulate_innings(sim, env, body, seed, timer)
+
+        if key is not None:
+            result_cache.put(key, result)
+        t0 = time.perf_counter()
+        resp = _respond(_innings_payload(result, body))
+        timer.add("response_build", time.perf_counter() - t0)
+        resp.headers["X-Cache"] = "MISS" if key is not None else "BYPASS"
+        return resp
+
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "bad_request", "message": str(e)}), 400
+
+    except PoolBusy as e:
+        resp = jsonify({"error": "busy", "message": f"Server busy ({e}). Please retry shortly."})
+        resp.headers["Retry-After"] = "1"
+        return resp, 503
 
+    except Exception as e:
+        tb = traceback.format_exc()
+        current_app.logger.error("simulate_ajax error: %s", tb)
+        return jsonify({"error": "server_error", "message": str(e)}), 500
+
+
+def _simulate_innings(sim, env, body, seed=None, timer=NULL_TIMER):
+    lines = []
+    for kind, item in _iter_innings(sim, env, body, seed, timer):
+        if kind == "summary":
+            item["lines"] = lines
+            return item
+        lines.append(item)
+
+
+def _iter_innings(sim, env, body, seed=None, timer=NULL_TIMER):
+    """
+    Play one innings, yielding ("ball", line) as each ball is bowled and finally
+    ("summary", {...}) with the final score, chart arrays and bowler usage.
+    Lines are built once, already JSON-ready, and not retained here.
+    Policy inference, simulator stepping and line building are timed into `timer`.
+    """
+    batting_team = body.get("batting_team", "TeamA")
+    batting_order = body.get("batting_order", None)
+
+    sim.tables = current_tables()[0]
+    sim.seed(seed)
+    res = env.reset()
+    obs = res[0] if isinstance(res, (tuple, list)) and len(res) >= 1 else res
+    sim.reset_match(batting_team_name=batting_team,
+                    batting_order=batting_order if isinstance(batting_order, list) else None)
+
+    done = False
+    ball_num = 1
+
+    balls = []
+    scores = []
+    wickets_arr = []
+    bowlers_count = {}
+
+    while not done:
+        t0 = time.perf_counter()
+        action, _ = get_predictor().predict(np.asarray(obs, dtype=np.float32), deterministic=True)
+        t1 = time.perf_counter()
+
+        try:
+            a0 = int(np.ravel(action)[0])
+            a1 = int(np.ravel(action)[1])
+        except Exception:
+            a0, a1 = 0, 1
+
+        res2 = env.step([a0, a1])
+        t2 = time.perf_counter()
+        timer.add("inference", t1 - t0)
+        timer.add("sim_step", t2 - t1)
+
+        info = {}
+        if isinstance(res2, (tuple, list)) and len(res2) >= 4:
+            obs = res2[0]
+            terminated = bool(res2[2])
+            truncated = bool(res2[3]) if len(res2) > 3 else False
+            done = terminated or truncated
+            if len(res2) > 4:
+                info = res2[4] or {}
+        elif isinstance(res2, (tuple, list)) and len(res2) == 3:
+            obs = res2[0]
+            done = bool(res2[2])
+        else:
+            obs = res2
+            done = False
+
+        outcome = info.get("outcome", {}) if isinstance(info, dict) else {}
+        bowler_used = info.get("bowler_used") if isinstance(info, dict) else None
+
+        if bowler_used:
+            bowler_name = bowler_used
+        elif outcome.get("bowler"):
+            bowler_name = outcome.get("bowler")
+        else:
+            bowler_name = f"bowler_{a0}"
+
+        batsman_name = outcome.get("batsman", getattr(sim, "current_batsman", "batsman_0"))
+        runs = int(outcome.get("runs", 0)) if outcome else 0
+        wicket = bool(outcome.get("wicket", False)) if outcome else False
+
+        bowler_name = str(bowler_name)
+        bowlers_count[bowler_name] = bowlers_count.get(bowler_name, 0) + 1
+        line = {
+            "ball": int(ball_num),
+            "bowler_id": f"bowler_{a0}",
+            "bowler_name": bowler_name,
+            "batsman": str(batsman_name),
+            "intent": {0: "defensive", 1: "normal", 2: "aggressive"}.get(int(a1), "normal"),
+            "runs": runs,
+            "wicket": wicket,
+            "score": f"{int(sim.score)}/{int(sim.wickets)}"
+        }
+
+        balls.append(int(ball_num))
+        scores.append(int(sim.score))
+        wickets_arr.append(int(sim.wickets))
+        timer.add("response_build", time.perf_counter() - t2)
+        yield "ball", line
+
+        ball_num += 1
+        if ball_num > 200:
+            yield "ball", {"note": "Stopped early: safety limit reached"}
+            break
+
+    yield "summary", {
+        "final_score": f"{int(sim.score)}/{int(sim.wickets)}",
+        "chart": {"balls": balls, "scores": scores, "wickets": wickets_arr},
+        "bowler_usage": bowlers_count
+    }
+
+
+@app.route("/simulate_stream", methods=["POST"])
+def simulate_stream():
+    """
+    NDJSON variant of /simulate_ajax: one {"type": "ball", ...} line per delivery as it
+    is simulated, then a {"type": "summary", ...} line without the per-ball list.
+    """
+    body = request.get_json(silent=True) or {}
+    timer = g.timer
+    stack = ExitStack()
+    try:
+        seed = body.get("seed")
+        seed = int(seed) if seed is not None else None
+        t0 = time.perf_counter()
+        sim, env = stack.enter_context(get_pool().acquire())
+        timer.add("queue_wait", time.perf_counter() - t0)
+        stack.enter_context(get_predictor().session())
+
+    except (TypeError, ValueError) as e:
+        stack.close()
+        return jsonify({"error": "bad_request", "message": str(e)}), 400
+
+    except PoolBusy as e:
+        stack.close()
+        resp = jsonify({"error": "busy", "message": f"Server busy ({e}). Please retry shortly."})
+        resp.headers["Retry-After"] = "1"
+        return resp, 503
+
+    def generate():
+        status = 200
+        try:
+            for kind, item in _iter_innings(sim, env, body, seed, timer):
+                item["type"] = kind
+                yield json.dumps(item) + "\n"
+        except Exception as e:
+            status = 500
+            current_app.logger.error("simulate_stream error: %s", traceback.format_exc())
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+        finally:
+            stack.close()
+            metrics.record("simulate_stream", timer, status)
+
+    resp = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def _parse_balls(body):
+    if "balls_bowled" in body:
+        return int(body["balls_bowled"])
+    return parse_overs(body.get("overs", "0"))
+
+
+@app.route("/project", methods=["POST"])
+def project():
+    """
+    Monte Carlo projection from an arbitrary match state, e.g.
+    {"score": 87, "wickets": 3, "overs": "11.2", "striker": "X", "non_striker": "Y",
+     "batting_order": [batters still to come], "target": 160, "n_rollouts": 10000,
+     "plan": "ppo" | "dp" | [bowler slot per over]}
+    Rollouts stop early to fit budget_ms (default PROJECT_BUDGET_MS; null for no limit).
+    """
     try:
         body = request.get_json(silent=True) or {}
-        batting_team = body.get("batting_team", "TeamA")
-        batting_order = body.get("batting_order", None)
-        sim.reset_match(batting_team_name=batting_team,
-                        batting_order=batting_order if isinstance(batting_order, list) else None)
-
-        res = env.reset()
-        obs = res[0] if isinstance(res, (tuple, list)) and len(res) >= 1 else res
-
-        done = False
-        ball_num = 1
-
-        lines = []
-        balls = []
-        scores = []
-        wickets_arr = []
-        bowlers_count = {}
-
-        while not done:
-            try:
-                obs_arr = np.asarray(obs, dtype=np.float32)
-            except Exception:
-                obs_arr = np.asarray(obs)
-
-            try:
-                action, _ = model.predict(obs_arr, deterministic=True)
-            except Exception:
-                action, _ = model.predict(np.asarray([obs_arr]), deterministic=True)
-                if getattr(action, "shape", None) and action.shape[0] == 1:
-                    action = action[0]
-
-            try:
-                a0 = int(np.ravel(action)[0])
-                a1 = int(np.ravel(action)[1])
-            except Exception:
-                a0, a1 = 0, 1
-
-            res2 = env.step([a0, a1])
-
-            info = {}
-            reward = 0
-            if isinstance(res2, (tuple, list)) and len(res2) >= 4:
-                obs = res2[0]
-                reward = res2[1]
-                terminated = bool(res2[2])
-                truncated = bool(res2[3]) if len(res2) > 3 else False
-                done = terminated or truncated
-                if len(res2) > 4:
-                    info = res2[4] or {}
-            elif isinstance(res2, (tuple, list)) and len(res2) == 3:
-                obs = res2[0]
-                reward = res2[1]
-                done = bool(res2[2])
-            else:
-                obs = res2
-                done = False
-
-            outcome = info.get("outcome", {}) if isinstance(info, dict) else {}
-            bowler_used = info.get("bowler_used") if isinstance(info, dict) else None
-
-            if bowler_used:
-                bowler_name = bowler_used
-            elif outcome.get("bowler"):
-                bowler_name = outcome.get("bowler")
-            else:
-                bowler_name = f"bowler_{a0}"
-
-            batsman_name = outcome.get("batsman", getattr(sim, "current_batsman", "batsman_0"))
-            runs = int(outcome.get("runs", 0)) if outcome else 0
-            wicket = bool(outcome.get("wicket", False)) if outcome else False
-
-            bowlers_count[bowler_name] = bowlers_count.get(bowler_name, 0) + 1
-            lines.append({
-                "ball": int(ball_num),
-                "bowler_id": f"bowler_{a0}",
-                "bowler_name": str(bowler_name),
-                "batsman": str(batsman_name),
-                "intent": {0: "defensive", 1: "normal", 2: "aggressive"}.get(int(a1), "normal"),
-                "runs": int(runs),
-                "wicket": bool(wicket),
-                "score": f"{int(sim.score)}/{int(sim.wickets)}"
-            })
-
-            balls.append(int(ball_num))
-            scores.append(int(sim.score))
-            wickets_arr.append(int(sim.wickets))
-
-            ball_num += 1
-            if ball_num > 200:
-                lines.append({"note": "Stopped early: safety limit reached"})
-                break
-
-        balls_py = [int(x) for x in balls]
-        scores_py = [int(x) for x in scores]
-        wickets_py = [int(x) for x in wickets_arr]
-        bowler_usage_py = {str(k): int(v) for k, v in bowlers_count.items()}
-
-        lines_py = []
-        for l in lines:
-            if "note" in l:
-                lines_py.append({"note": str(l["note"])})
-                continue
-            lines_py.append({
-                "ball": int(l.get("ball", 0)),
-                "bowler_id": str(l.get("bowler_id", "")),
-                "bowler_name": str(l.get("bowler_name", "")),
-                "batsman": str(l.get("batsman", "")),
-                "intent": str(l.get("intent", "")),
-                "runs": int(l.get("runs", 0)),
-                "wicket": bool(l.get("wicket", False)),
-                "score": str(l.get("score", "0/0"))
-            })
-
-        final_score = f"{int(sim.score)}/{int(sim.wickets)}"
-        response = {
-            "lines": lines_py,
-            "final_score": final_score,
-            "chart": {"balls": balls_py, "scores": scores_py, "wickets": wickets_py},
-            "bowler_usage": bowler_usage_py
+        n_rollouts = min(int(body.get("n_rollouts", 10000)), MAX_ROLLOUTS)
+        plan = body.get("plan", "ppo")
+        if isinstance(plan, list):
+            plan = parse_plan(plan)
+            policy = plan_policy(plan, intent=int(body.get("intent", 1)))
+        elif plan == "dp":
+            policy = model_policy(get_dp_policy())
+        elif plan == "ppo":
+            policy = model_policy(get_model())
+        else:
+            raise ValueError(f"unknown plan {plan!r}: use \"ppo\", \"dp\" or a list of bowler slots")
+        budget_ms = body.get("budget_ms", PROJECT_BUDGET_MS)
+        tables = current_tables()[0]
+        order = None
+        if "striker" in body or "non_striker" in body:
+            rest = body.get("batting_order") or tables.batsman_list
+            if not isinstance(rest, (list, tuple)):
+                raise ValueError("batting_order must be a list of names")
+            order = batting_order(body.get("striker", "striker"), body.get("non_striker", "non_striker"), rest)
+
+        t0 = time.perf_counter()
+        result = project_innings(
+            tables, policy,
+            n_rollouts=n_rollouts,
+            score=int(body.get("score", 0)),
+            wickets=int(body.get("wickets", 0)),
+            balls_bowled=_parse_balls(body),
+            last5=body.get("last5"),
+            target=body.get("target"),
+            seed=body.get("seed"),
+            budget_ms=None if budget_ms is None else float(budget_ms),
+            matchups=_lazy_get("matchups", _load_matchups),
+            batting_order=order,
+        )
+        g.timer.add("rollouts", time.perf_counter() - t0)
+
+        runs = result.pop("batsmen_additional_runs")
+        result["batsmen_additional_runs"] = {
+            str(body.get("striker", "striker")): runs["striker"],
+            str(body.get("non_striker", "non_striker")): runs["non_striker"],
         }
-        return jsonify(response)
+        result["plan"] = plan
+        return _respond(result)
+
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "bad_request", "message": str(e)}), 400
 
     except Exception as e:
         tb = traceback.format_exc()
-        current_app.logger.error("simulate_ajax error: %s", tb)
+        current_app.logger.error("project error: %s", tb)
         return jsonify({"error": "server_error", "message": str(e)}), 500
 
-    finally:
-        _simulate_lock.release()
+
+@app.route("/sweep", methods=["POST"])
+def sweep():
+    """
+    Run a list of scenarios (batting order, starting state, innings, seed, policy; see
+    sweep.parse_scenario) on the sweep process pool and return a summary per scenario.
+    With "stream": true the response is NDJSON: {"type": "progress", ...} lines as
+    chunks finish, then {"type": "result", ...}.
+    """
+    body = request.get_json(silent=True) or {}
+    scenarios = body.get("scenarios")
+    if not isinstance(scenarios, list) or not scenarios:
+        return jsonify({"error": "bad_request", "message": "scenarios must be a non-empty list"}), 400
+    try:
+        events = get_sweep_runner().iter_run(scenarios)
+        t0 = time.perf_counter()
+        first = next(events)
+        if not body.get("stream"):
+            for first in events:
+                pass
+            g.timer.add("rollouts", time.perf_counter() - t0)
+            return _respond(first[1])
+
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "bad_request", "message": str(e)}), 400
+
+    except Exception as e:
+        current_app.logger.error("sweep error: %s", traceback.format_exc())
+        return jsonify({"error": "server_error", "message": str(e)}), 500
+
+    def generate():
+        try:
+            yield json.dumps(dict(first[1], type=first[0])) + "\n"
+            for kind, item in events:
+                yield json.dumps(dict(item, type=kind)) + "\n"
+        except Exception as e:
+            current_app.logger.error("sweep error: %s", traceback.format_exc())
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+
+    resp = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queue a long sweep: same scenarios as /sweep, without the per-request innings limit.
+    Returns 202 with the job id; poll GET /jobs/<id> for progress and partial results.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        job = get_jobs().submit(body.get("scenarios"), body.get("chunk_size"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "bad_request", "message": str(e)}), 400
+    resp = jsonify(job.status_dict(with_results=False))
+    resp.headers["Location"] = f"/jobs/{job.id}"
+    return resp, 202
+
+
+@app.route("/jobs")
+def list_jobs():
+    return jsonify({"jobs": get_jobs().list()})
+
+
+@app.route("/jobs/<job_id>", methods=["GET", "DELETE"])
+def job_status(job_id):
+    """Status, progress, throughput and results so far; DELETE cancels the job after its in-flight chunks."""
+    jobs = get_jobs()
+    job = jobs.cancel(job_id) if request.method == "DELETE" else jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "not_found", "message": f"no job {job_id}"}), 404
+    return _respond(job.status_dict())
+
+
+@app.route("/inference_stats")
+def inference_stats():
+    if "predictor" not in _lazy:
+        return jsonify({"batches": 0})
+    stats = get_predictor().stats()
+    if isinstance(_lazy.get("model"), TablePolicy):
+        stats["policy_table"] = get_model().stats()
+    return jsonify(stats)
+
+
+@app.route("/cache_stats")
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/dashboard")
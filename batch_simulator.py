@@ -0,0 +1,180 @@
+import numpy as np
+
+from tables import load_tables
+from matchups import load_matchups
+
+MAX_BALLS = 120
+MAX_WICKETS = 10
+MAX_BATSMEN = MAX_WICKETS + 2
+
+
+class BatchSimulator:
+    """
+    Array-backed counterpart of EmpiricalSimulator that plays N innings at once.
+
+    Every innings is a row in the state arrays; `step` advances all unfinished
+    innings by one ball with the same outcome rules as EmpiricalSimulator.step
+    (intent adjustments, strike rotation on odd runs, end at 120 balls or 10 wickets).
+    Batsmen are tracked as positions in the batting order.
+
+    With `matchups`, outcomes also depend on the striker: batting positions map to
+    `batting_order` (default: the tables' batsman_list, as in EmpiricalSimulator) and
+    unknown batters back off.
+    """
+
+    def __init__(self, empirical_json_path, n_innings, mappings_path='processed/mappings.json', seed=None,
+                 matchups=None, batting_order=None):
+        self.tables = load_tables(empirical_json_path, mappings_path)
+        self.bowler_names = list(self.tables.slot_names)
+        self.n_bowlers = self.tables.n_slots
+        self.batting_order = list(batting_order if batting_order else self.tables.batsman_list)[:MAX_BATSMEN]
+
+        self.matchups = load_matchups(matchups)
+        if self.matchups is not None:
+            # cdf rows for every (phase, bowler slot, batting position) this simulator can meet
+            m = self.matchups
+            bowlers = np.array([m.bowler_id(b) for b in self.bowler_names] + [m.bowler_id(None)])
+            order = self.batting_order
+            batters = np.array([m.batter_id(b) for b in order] + [m.batter_id(None)] * (MAX_BATSMEN - len(order)))
+            self._matchup_rows = m.rows(np.arange(3)[:, None, None], bowlers[None, :, None], batters[None, None, :])
+
+        self.n = int(n_innings)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self, idx=None):
+        if idx is None:
+            self.score = np.zeros(self.n, dtype=np.int32)
+            self.wickets = np.zeros(self.n, dtype=np.int32)
+            self.balls_bowled = np.zeros(self.n, dtype=np.int32)
+            self.striker = np.zeros(self.n, dtype=np.int32)
+            self.non_striker = np.ones(self.n, dtype=np.int32)
+            self.next_bat_idx = np.full(self.n, 2, dtype=np.int32)
+            self.batsman_scores = np.zeros((self.n, MAX_BATSMEN), dtype=np.int32)
+            self.done = np.zeros(self.n, dtype=bool)
+            return
+
+        self.score[idx] = 0
+        self.wickets[idx] = 0
+        self.balls_bowled[idx] = 0
+        self.striker[idx] = 0
+        self.non_striker[idx] = 1
+        self.next_bat_idx[idx] = 2
+        self.batsman_scores[idx] = 0
+        self.done[idx] = False
+
+    def set_state(self, score=0, wickets=0, balls_bowled=0, striker=0, non_striker=1, next_bat_idx=None):
+        """Start every innings from the same mid-innings state."""
+        self.reset()
+        self.score[:] = score
+        self.wickets[:] = wickets
+        self.balls_bowled[:] = balls_bowled
+        self.striker[:] = striker
+        self.non_striker[:] = non_striker
+        self.next_bat_idx[:] = max(striker, non_striker) + 1 if next_bat_idx is None else next_bat_idx
+        self.done[:] = (self.balls_bowled >= MAX_BALLS) | (self.wickets >= MAX_WICKETS)
+
+    @property
+    def over(self):
+        return self.balls_bowled // 6
+
+    @property
+    def ball(self):
+        return self.balls_bowled % 6
+
+    def phase_ids(self):
+        over = self.over
+        return np.where(over < 6, 0, np.where(over < 16, 1, 2))
+
+    def observations(self, last5, max_balls=MAX_BALLS):
+        """(n, 13) observations laid out like CricketEnv._get_obs."""
+        obs = np.empty((self.n, 13), dtype=np.float32)
+        obs[:, 0] = self.over
+        obs[:, 1] = self.ball
+        obs[:, 2] = self.score
+        obs[:, 3] = self.wickets
+        obs[:, 4] = np.maximum(0, max_balls - self.balls_bowled)
+        obs[:, 5:8] = self.phase_ids()[:, None] == np.arange(3)
+        obs[:, 8:] = last5
+        return obs
+
+    def sample_ball(self, rows, bowler_idx):
+        phase = self.phase_ids()[rows]
+        if self.matchups is not None:
+            slot = np.where((bowler_idx >= 0) & (bowler_idx < self.n_bowlers), bowler_idx, self.n_bowlers)
+            row = self._matchup_rows[phase, slot, np.minimum(self.striker[rows], MAX_BATSMEN - 1)]
+            cdf, wicket_prob = self.matchups.cdf[row], self.matchups.wicket_prob[row]
+        else:
+            bowler = self.tables.slot_to_id(bowler_idx)
+            cdf, wicket_prob = self.tables.cdf[phase, bowler], self.tables.wicket_prob[phase, bowler]
+
+        u = self.rng.random(len(rows))
+        runs = np.minimum((u[:, None] >= cdf).sum(axis=1), 6)
+        wicket = self.rng.random(len(rows)) < wicket_prob
+        return runs, wicket
+
+    def step(self, bowler_idx, intent_idx=None):
+        """
+        bowler_idx / intent_idx: int arrays of shape (n,), one action per innings.
+        Finished innings are left untouched. Returns per-innings arrays for this ball.
+        """
+        bowler_idx = np.broadcast_to(np.asarray(bowler_idx, dtype=np.int64), (self.n,))
+        if intent_idx is None:
+            intent_idx = np.ones(self.n, dtype=np.int64)
+        intent_idx = np.broadcast_to(np.asarray(intent_idx, dtype=np.int64), (self.n,))
+
+        runs_out = np.zeros(self.n, dtype=np.int32)
+        wicket_out = np.zeros(self.n, dtype=bool)
+        batsman_out = self.striker.copy()
+
+        rows = np.flatnonzero(~self.done)
+        if len(rows) == 0:
+            return {'runs': runs_out, 'wicket': wicket_out, 'batsman': batsman_out, 'match_end': self.done.copy()}
+
+        runs, wicket = self.sample_ball(rows, bowler_idx[rows])
+        intent = intent_idx[rows]
+
+        aggressive = intent == 2
+        bump = aggressive & (self.rng.random(len(rows)) < 0.15)
+        runs = np.where(bump, np.minimum(6, runs + self.rng.integers(0, 3, len(rows))), runs)
+        wicket = wicket | (aggressive & (self.rng.random(len(rows)) < 0.03))
+
+        defensive = intent == 0
+        trim = defensive & (self.rng.random(len(rows)) < 0.6)
+        runs = np.where(trim, np.maximum(0, runs - 1), runs)
+
+        striker = self.striker[rows]
+        slot = np.minimum(striker, MAX_BATSMEN - 1)
+        self.batsman_scores[rows, slot] += runs
+        self.score[rows] += runs
+
+        self.wickets[rows] += wicket
+        new_batsman = self.next_bat_idx[rows]
+        self.next_bat_idx[rows] += wicket
+
+        rotate = ~wicket & (runs % 2 == 1)
+        non_striker = self.non_striker[rows]
+        self.striker[rows] = np.where(wicket, new_batsman, np.where(rotate, non_striker, striker))
+        self.non_striker[rows] = np.where(rotate, striker, non_striker)
+
+        self.balls_bowled[rows] += 1
+        self.done[rows] = (self.balls_bowled[rows] >= MAX_BALLS) | (self.wickets[rows] >= MAX_WICKETS)
+
+        runs_out[rows] = runs
+        wicket_out[rows] = wicket
+        batsman_out[rows] = striker
+        return {'runs': runs_out, 'wicket': wicket_out, 'batsman': batsman_out, 'match_end': self.done.copy()}
+
+    def run(self, policy=None):
+        """
+        Play every innings to completion. `policy(sim)` returns (bowler_idx, intent_idx)
+        arrays; by default bowlers are drawn uniformly with normal intent.
+        """
+        while not self.done.all():
+            if policy is None:
+                bowler = self.rng.integers(0, self.n_bowlers, self.n)
+                intent = None
+            else:
+                bowler, intent = policy(self)
+            self.step(bowler, intent)
+        return self.score.copy(), self.wickets.copy()
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import EmpiricalSimulator
+from batch_simulator import BatchSimulator
+
+
+def bench_scalar(sim, n_innings):
+    t0 = time.perf_counter()
+    for _ in range(n_innings):
+        sim.reset_match()
+        while not sim.done:
+            sim.step([np.random.randint(0, 10), 1])
+    return n_innings / (time.perf_counter() - t0)
+
+
+def bench_batch(empirical, mappings, n_innings, seed=0):
+    t0 = time.perf_counter()
+    sim = BatchSimulator(empirical, n_innings, mappings_path=mappings, seed=seed)
+    sim.run()
+    return n_innings / (time.perf_counter() - t0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='processed/deliveries_processed.parquet')
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--scalar-innings', type=int, default=500)
+    parser.add_argument('--batch-innings', type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.data, columns=['batsman'])
+    sim = EmpiricalSimulator(df, args.empirical, mappings_path=args.mappings)
+
+    scalar = bench_scalar(sim, args.scalar_innings)
+    batch = bench_batch(args.empirical, args.mappings, args.batch_innings)
+
+    print(f"scalar EmpiricalSimulator: {scalar:,.0f} innings/sec ({args.scalar_innings} innings)")
+    print(f"BatchSimulator:            {batch:,.0f} innings/sec ({args.batch_innings} innings)")
+    print(f"speedup: {batch / scalar:.1f}x")
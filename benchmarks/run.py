@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import tempfile
+import platform
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+EMPIRICAL = 'processed/empirical_tables.npz'
+MAPPINGS = 'processed/mappings.json'
+
+
+def metric(value, unit, better='higher'):
+    return {'value': float(value), 'unit': unit, 'better': better}
+
+
+REPEAT = 3
+
+
+def rate(fn, n):
+    """Best of REPEAT runs, which is less noisy than the mean on a shared machine."""
+    best = float('inf')
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(n)
+        best = min(best, time.perf_counter() - t0)
+    return n / best
+
+
+def bench_simulator(quick):
+    from simulator import EmpiricalSimulator
+    sim = EmpiricalSimulator(None, EMPIRICAL, mappings_path=MAPPINGS, seed=0)
+    n = 20_000 if quick else 200_000
+
+    def sample(n):
+        for i in range(n):
+            sim.sample_ball(f"bowler_{i % 10}")
+
+    def step(n):
+        for i in range(n):
+            if sim.done:
+                sim.reset_match()
+            sim.step([i % 10, 1])
+
+    return {
+        'simulator.sample_ball': metric(rate(sample, n), 'balls/s'),
+        'simulator.step': metric(rate(step, n), 'balls/s'),
+    }
+
+
+def bench_batch_simulator(quick):
+    from batch_simulator import BatchSimulator
+    sim = BatchSimulator(EMPIRICAL, 10_000 if quick else 100_000, mappings_path=MAPPINGS, seed=0)
+
+    def run(n):
+        sim.reset()
+        sim.run()
+
+    return {'batch_simulator.innings': metric(rate(run, sim.n), 'innings/s')}
+
+
+def bench_env(quick):
+    from simulator import EmpiricalSimulator
+    from env import CricketEnv
+    env = CricketEnv(EmpiricalSimulator(None, EMPIRICAL, mappings_path=MAPPINGS, seed=0))
+    env.reset(seed=0)
+
+    def step(n):
+        for i in range(n):
+            _, _, done, _, _ = env.step([i % 10, 1])
+            if done:
+                env.reset()
+
+    return {'env.step': metric(rate(step, 10_000 if quick else 100_000), 'steps/s')}
+
+
+def bench_serving(quick):
+    # keep the mapped serving state out of processed/ so benchmarking leaves the tree untouched
+    tmp = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    os.environ['SHARED_STATE'] = os.path.join(tmp, 'shared_state.bin')
+    import app
+    client = app.app.test_client()
+    client.post('/simulate_ajax', json={'seed': 0})
+
+    latencies = []
+    for i in range(20 if quick else 200):
+        t0 = time.perf_counter()
+        resp = client.post('/simulate_ajax', json={})
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert resp.status_code == 200, resp.status_code
+
+    return {
+        'simulate_ajax.p50': metric(np.percentile(latencies, 50), 'ms', 'lower'),
+        'simulate_ajax.p99': metric(np.percentile(latencies, 99), 'ms', 'lower'),
+    }
+
+
+def bench_train(quick):
+    from train import build_vec_env, train
+    timesteps = 2048 if quick else 8192
+    vec_env = build_vec_env('dummy', 1, None, EMPIRICAL, MAPPINGS, seed=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        model = train(vec_env, total_timesteps=timesteps, model_path=os.path.join(tmp, 'ppo'), seed=0)
+        elapsed = time.perf_counter() - t0
+    vec_env.close()
+    return {'train.ppo': metric(model.num_timesteps / elapsed, 'steps/s')}
+
+
+def synthetic_deliveries(path, n_innings, seed=0):
+    """Ball-by-ball CSV in the raw input layout, 120 deliveries per innings."""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    rows = n_innings * 120
+    innings = np.repeat(np.arange(n_innings), 120)
+    balls = np.tile(np.arange(120), n_innings)
+    dismissed = rng.random(rows) < 0.05
+    pd.DataFrame({
+        'matchId': innings // 2,
+        'inning': innings % 2 + 1,
+        'over': balls // 6,
+        'ball': balls % 6 + 1,
+        'batsman': rng.integers(0, 300, rows).astype(str),
+        'bowler': np.char.add('bowler ', rng.integers(0, 400, rows).astype(str)),
+        'batsman_runs': rng.choice([0, 1, 2, 3, 4, 6], rows, p=[0.4, 0.35, 0.08, 0.02, 0.1, 0.05]),
+        'extras': (rng.random(rows) < 0.05).astype(int),
+        'player_dismissed': np.where(dismissed, 'someone', None),
+        'dismissal_kind': np.where(dismissed, 'caught', None),
+        'date': '2024-04-01',
+    }).to_csv(path, index=False)
+    return rows
+
+
+def bench_prepare_data(quick):
+    from data_prep import prepare_data
+    out = {}
+    sizes = [200, 1000] if quick else [500, 2000, 8000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_innings in sizes:
+            csv_path = os.path.join(tmp, f'deliveries_{n_innings}.csv')
+            rows = synthetic_deliveries(csv_path, n_innings)
+            t0 = time.perf_counter()
+            prepare_data(csv_path, os.path.join(tmp, f'out_{n_innings}'))
+            out[f'prepare_data.{rows}_rows'] = metric(rows / (time.perf_counter() - t0), 'rows/s')
+    return out
+
+
+BENCHMARKS = {
+    'simulator': bench_simulator,
+    'batch_simulator': bench_batch_simulator,
+    'env': bench_env,
+    'serving': bench_serving,
+    'train': bench_train,
+    'prepare_data': bench_prepare_data,
+}
+
+
+def compare(results, baseline, threshold):
+    """Metrics that got worse than baseline by more than `threshold` (a fraction)."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if base is None or base['value'] == 0:
+            continue
+        change = (cur['value'] - base['value']) / base['value']
+        worse = -change if cur['better'] == 'higher' else change
+        status = 'REGRESSION' if worse > threshold else 'ok'
+        print(f"{name:34s} {base['value']:>12.1f} -> {cur['value']:>12.1f} {cur['unit']:10s} {change:+7.1%}  {status}")
+        if worse > threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='run a subset')
+    parser.add_argument('--quick', action='store_true', help='smaller workloads for a fast smoke run')
+    parser.add_argument('--out', default='benchmarks/results.json')
+    parser.add_argument('--baseline', default='benchmarks/baseline.json')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown vs baseline, e.g. 0.2 = 20%%')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='runs per throughput metric (best is kept)')
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the new baseline')
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    REPEAT = args.repeat
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"running {name}...", flush=True)
+        results.update(BENCHMARKS[name](args.quick))
+
+    report = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'quick': args.quick,
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results → {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline → {args.baseline}")
+    else:
+        baseline = None
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            if baseline.get('quick', False) != args.quick:
+                mode = 'quick' if baseline.get('quick', False) else 'full'
+                print(f"{args.baseline} was recorded in {mode} mode; not comparing")
+                baseline = None
+        if baseline is not None:
+            regressions = compare(results, baseline['results'], args.threshold)
+            if regressions:
+                raise SystemExit(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        else:
+            for name, m in results.items():
+                print(f"{name:34s} {m['value']:>12.1f} {m['unit']}")
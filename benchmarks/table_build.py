@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tables import OutcomeCounter
+from data_prep import count_outcomes
+
+
+def legacy_build(df):
+    """The per-group loop data_prep used before the vectorized OutcomeCounter."""
+    df = df.copy()
+    df['phase'] = df['over'].apply(lambda o: 'powerplay' if o <= 6 else ('middle' if o <= 15 else 'death'))
+    df['runs_bucket'] = df['total_runs'].clip(0, 6)
+
+    emp = {}
+    for (phase, bowler), g in df.groupby(['phase', 'bowler']):
+        counts = g['runs_bucket'].value_counts().to_dict()
+        total = g.shape[0]
+        emp[f"{phase}||{bowler}"] = {
+            'probs_runs': [counts.get(i, 0) / total for i in range(7)],
+            'wicket_prob': float(g['wicket'].mean()),
+            'sample_count': int(total)
+        }
+    return emp
+
+
+def vectorized_build(df, slot_names):
+    counter = OutcomeCounter()
+    count_outcomes(df, counter)
+    return counter.to_tables(slot_names)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='processed/deliveries_processed.parquet')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.data, columns=['over', 'bowler', 'total_runs', 'wicket'])
+    slot_names = df['bowler'].value_counts().index[:12].tolist()
+
+    legacy = best_of(lambda: legacy_build(df), args.repeat)
+    vectorized = best_of(lambda: vectorized_build(df, slot_names), args.repeat)
+
+    print(f"rows: {len(df):,}")
+    print(f"legacy groupby loop: {legacy * 1000:8.1f} ms")
+    print(f"vectorized bincount: {vectorized * 1000:8.1f} ms")
+    print(f"speedup: {legacy / vectorized:.1f}x")
@@ -1,36 +1,39 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
 import json
 import argparse
 from tqdm import tqdm
 
-core_required = ['match_id','inning','over','ball','bowler','batsman_runs','date']
-
+from tables import CompiledTables, OutcomeCounter
+from delivery_store import build_store
+from matchups import build_matchups
 
-def prepare_data(input_csv, out_dir):
-
-    print("Loading CSV:", input_csv)
-    df = pd.read_csv(input_csv)
+core_required = ['match_id','inning','over','ball','bowler','batsman_runs','date']
 
-    df.rename(columns={
-    'matchId': 'match_id',
-    'over_ball': 'over_ball'
-}, inplace=True)
 
-    os.makedirs(out_dir, exist_ok=True)
+def normalize_columns(df, verbose=True):
+    """Rename source columns and fill optional ones; vectorized, safe to run per chunk."""
+    df = df.rename(columns={
+        'matchId': 'match_id',
+        'over_ball': 'over_ball'
+    })
 
     for c in core_required:
         if c not in df.columns:
             raise ValueError(f"Dataset missing essential column: {c}")
 
     if 'total_runs' not in df.columns:
-        print("⚠ total_runs not found → creating from batsman_runs + extra_runs")
+        if verbose:
+            print("⚠ total_runs not found → creating from batsman_runs + extra_runs")
         if 'extra_runs' in df.columns:
             df['total_runs'] = df['batsman_runs'] + df['extra_runs']
         elif 'extras' in df.columns:
             df['total_runs'] = df['batsman_runs'] + df['extras']
         else:
-            df['total_runs'] = df['batsman_runs']    
+            df['total_runs'] = df['batsman_runs']
 
     if 'extras' not in df.columns:
         if 'extra_runs' in df.columns:
@@ -39,13 +42,15 @@ def prepare_data(input_csv, out_dir):
             df['extras'] = 0
 
     if 'player_dismissed' not in df.columns:
-        print("⚠ player_dismissed not found → filling with 'none'")
+        if verbose:
+            print("⚠ player_dismissed not found → filling with 'none'")
         df['player_dismissed'] = 'none'
     else:
         df['player_dismissed'] = df['player_dismissed'].fillna('none')
 
     if 'dismissal_kind' not in df.columns:
-        print("⚠ dismissal_kind not found → filling with 'not_out'")
+        if verbose:
+            print("⚠ dismissal_kind not found → filling with 'not_out'")
         df['dismissal_kind'] = 'not_out'
     else:
         df['dismissal_kind'] = df['dismissal_kind'].fillna('not_out')
@@ -54,64 +59,189 @@ def prepare_data(input_csv, out_dir):
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
     except:
         print("⚠ date format could not be parsed")
+    return df
+
 
-    df = df.sort_values(['match_id','inning','over','ball']).reset_index(drop=True)
+def derive_columns(df):
+    """Per-innings derived columns. Every (match_id, inning) in df must be complete."""
+    df = df.sort_values(['match_id','inning','over','ball'], kind='stable').reset_index(drop=True)
 
-    df['runs_cumulative'] = df.groupby(['match_id','inning'])['total_runs'].cumsum()
-    df['wicket'] = df['player_dismissed'].apply(lambda x: x != 'none')
+    innings = df.groupby(['match_id','inning'], sort=False)
+    df['runs_cumulative'] = innings['total_runs'].cumsum()
+    df['wicket'] = df['player_dismissed'].ne('none')
 
     df['over_ball'] = df['over'].astype(str) + '.' + df['ball'].astype(str)
 
-    df['balls_bowled'] = df.groupby(['match_id','inning']).cumcount() + 1
+    df['balls_bowled'] = innings.cumcount() + 1
     df['balls_left'] = 120 - df['balls_bowled']
+    return df
 
 
-    parquet_path = os.path.join(out_dir, 'deliveries_processed.parquet')
-    df.to_parquet(parquet_path, index=False)
-    print("Saved processed deliveries →", parquet_path)
+def phase_ids(over):
+    """0 = powerplay, 1 = middle, 2 = death (tables.PHASES order)."""
+    return np.select([over <= 6, over <= 15], [0, 1], 2)
 
-    def over_phase(over):
-        if over <= 6:
-            return 'powerplay'
-        elif over <= 15:
-            return 'middle'
-        else:
-            return 'death'
 
-    df['phase'] = df['over'].apply(over_phase)
-    df['runs_bucket'] = df['total_runs'].clip(0, 6)
+def count_outcomes(df, counter):
+    counter.add(phase_ids(df['over'].to_numpy()), df['bowler'].to_numpy(),
+                df['total_runs'].to_numpy(), df['wicket'].to_numpy(), df['match_id'].to_numpy())
 
-    emp = {}
-    print("Building empirical probability tables...")
-    grp = df.groupby(['phase', 'bowler'])
 
-    for (phase, bowler), g in tqdm(grp):
-        key = f"{phase}||{bowler}"
+def write_empirical_tables(counter, out_dir, write_json=False, slot_names=None, batsman_list=None):
+    """
+    Save the compiled tables (empirical_tables.npz) and, if asked, the legacy JSON.
+    Agent bowler slots come from slot_names when given, then mappings.json in out_dir,
+    otherwise the 12 bowlers with the most deliveries.
+    """
+    mappings_path = os.path.join(out_dir, 'mappings.json')
+    if slot_names is not None:
+        batsman_list = batsman_list or []
+    elif os.path.exists(mappings_path):
+        with open(mappings_path, 'r', encoding='utf-8') as f:
+            m = json.load(f)
+        slot_names = list(m.get('bowler_map', {}).values())
+        batsman_list = m.get('batsman_list', [])
+    else:
+        slot_names = counter.top_bowlers(12)
+        batsman_list = []
 
-        counts = g['runs_bucket'].value_counts().to_dict()
-        total = g.shape[0]
+    npz_path = os.path.join(out_dir, 'empirical_tables.npz')
+    counter.to_tables(slot_names, batsman_list).save(npz_path)
+    print("Saved empirical tables →", npz_path)
 
-        probs = [counts.get(i, 0) / total for i in range(7)]
-        wicket_prob = g['wicket'].mean()
+    if write_json:
+        json_path = os.path.join(out_dir, 'empirical_tables.json')
+        with open(json_path, 'w') as f:
+            json.dump(counter.to_json_dict(), f, indent=4)
+        print("Saved empirical tables →", json_path)
 
-        emp[key] = {
-            'probs_runs': probs,
-            'wicket_prob': float(wicket_prob),
-            'sample_count': int(total)
-        }
 
-    json_path = os.path.join(out_dir, 'empirical_tables.json')
-    with open(json_path, 'w') as f:
-        json.dump(emp, f, indent=4)
+def prepare_data(input_csv, out_dir, write_json=False):
 
-    print("Saved empirical tables →", json_path)
+    print("Loading CSV:", input_csv)
+    df = pd.read_csv(input_csv)
+
+    os.makedirs(out_dir, exist_ok=True)
+    df = derive_columns(normalize_columns(df))
+
+    parquet_path = os.path.join(out_dir, 'deliveries_processed.parquet')
+    df.to_parquet(parquet_path, index=False)
+    print("Saved processed deliveries →", parquet_path)
+
+    counter = OutcomeCounter()
+    count_outcomes(df, counter)
+    write_empirical_tables(counter, out_dir, write_json)
 
 
+def prepare_data_streaming(input_csv, out_dir, chunksize=200_000, write_json=False):
+    """
+    Single pass over input_csv in chunks with bounded memory.
+
+    Rows of one innings must be contiguous in the file (as in ball-by-ball archives).
+    The trailing, possibly incomplete innings of each chunk is carried into the next.
+    Each batch of complete innings is appended to the Parquet file as its own row
+    group, and its outcome counts are folded into the running table counts.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    parquet_path = os.path.join(out_dir, 'deliveries_processed.parquet')
+
+    writer = None
+    counter = OutcomeCounter()
+    carry = None
+    rows = 0
+
+    def flush(part):
+        nonlocal writer, rows
+        part = derive_columns(part)
+        table = pa.Table.from_pandas(part, preserve_index=False,
+                                     schema=writer.schema if writer is not None else None)
+        if writer is None:
+            writer = pq.ParquetWriter(parquet_path, table.schema)
+        writer.write_table(table)
+        count_outcomes(part, counter)
+        rows += len(part)
+
+    print("Streaming CSV:", input_csv)
+    try:
+        for i, chunk in enumerate(tqdm(pd.read_csv(input_csv, chunksize=chunksize), unit='chunk')):
+            chunk = normalize_columns(chunk, verbose=i == 0)
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+
+            last = (chunk['match_id'].to_numpy() == chunk['match_id'].iat[-1]) & \
+                   (chunk['inning'].to_numpy() == chunk['inning'].iat[-1])
+            carry = chunk[last]
+            if (~last).any():
+                flush(chunk[~last])
+
+        if carry is not None and len(carry):
+            flush(carry)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"Saved processed deliveries → {parquet_path} ({rows} rows)")
+    write_empirical_tables(counter, out_dir, write_json)
+
+
+def update_tables(input_csv, out_dir, chunksize=200_000, write_json=False):
+    """
+    Fold a new deliveries file into the existing empirical_tables.npz counts.
+
+    Work is proportional to the new file only. Matches already in the tables (by
+    match_id) are skipped, so re-running the same nightly file is a no-op.
+    """
+    npz_path = os.path.join(out_dir, 'empirical_tables.npz')
+    tables = CompiledTables.load(npz_path)
+    counter = OutcomeCounter.from_tables(tables)
+    known = set(counter.match_ids)
+
+    added, skipped = set(), set()
+    for i, chunk in enumerate(pd.read_csv(input_csv, chunksize=chunksize)):
+        chunk = normalize_columns(chunk, verbose=i == 0)
+        seen = chunk['match_id'].isin(known)
+        skipped.update(chunk.loc[seen, 'match_id'].unique().tolist())
+        chunk = chunk[~seen]
+        if len(chunk):
+            chunk['wicket'] = chunk['player_dismissed'].ne('none')
+            count_outcomes(chunk, counter)
+            added.update(chunk['match_id'].unique().tolist())
+
+    print(f"Matches added: {len(added)}, already present: {len(skipped)}")
+    if added:
+        write_empirical_tables(counter, out_dir, write_json, tables.slot_names, tables.batsman_list)
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
+    parser.add_argument('command', nargs='?', choices=['prepare', 'update'], default='prepare',
+                        help='prepare: rebuild everything from --input; update: fold --input into the existing tables')
     parser.add_argument('--input', default='data/deliveries.csv')
     parser.add_argument('--out', default='processed')
+    parser.add_argument('--stream', action='store_true', help='process the CSV in chunks with bounded memory')
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    parser.add_argument('--json', action='store_true', help='also write the legacy empirical_tables.json')
+    parser.add_argument('--store', action='store_true',
+                        help='also write the compact memory-mapped delivery store to <out>/store')
+    parser.add_argument('--matchups', action='store_true',
+                        help='also write batter-vs-bowler tables to <out>/matchup_tables.npz')
     args = parser.parse_args()
 
-    prepare_data(args.input, args.out)
+    if args.command == 'update':
+        update_tables(args.input, args.out, chunksize=args.chunksize, write_json=args.json)
+    elif args.stream:
+        prepare_data_streaming(args.input, args.out, chunksize=args.chunksize, write_json=args.json)
+    else:
+        prepare_data(args.input, args.out, write_json=args.json)
+
+    if args.store and args.command == 'prepare':
+        store_dir = os.path.join(args.out, 'store')
+        build_store(pd.read_parquet(os.path.join(args.out, 'deliveries_processed.parquet')), store_dir)
+        print("Saved delivery store →", store_dir)
+
+    if args.matchups and args.command == 'prepare':
+        matchups_path = os.path.join(args.out, 'matchup_tables.npz')
+        df = pd.read_parquet(os.path.join(args.out, 'deliveries_processed.parquet'),
+                             columns=['over', 'bowler', 'batsman', 'total_runs', 'wicket'])
+        build_matchups(df).save(matchups_path)
+        print("Saved matchup tables →", matchups_path)
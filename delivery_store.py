@@ -0,0 +1,191 @@
+import os
+import json
+import argparse
+
+import numpy as np
+import pyarrow as pa
+
+PLAYER_COLUMNS = ['batsman', 'non_striker', 'bowler', 'player_dismissed']
+TEAM_COLUMNS = ['batting_team', 'bowling_team']
+INT_COLUMNS = {
+    'match_id': np.int32, 'inning': np.int8, 'over': np.int8, 'ball': np.int8,
+    'batsman_runs': np.int8, 'extras': np.int8, 'total_runs': np.int8,
+    'runs_cumulative': np.int16, 'balls_bowled': np.int16, 'balls_left': np.int16,
+}
+FLAG_COLUMNS = ['isWide', 'isNoBall', 'Byes', 'LegByes', 'Penalty']
+N_PHASES = 3
+
+
+def encode(values, dictionary):
+    """Integer codes for values, appending unseen ones to `dictionary` (a list of names)."""
+    index = {name: i for i, name in enumerate(dictionary)}
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    lookup = np.empty(len(uniques), dtype=np.int32)
+    for j, name in enumerate(uniques):
+        if name not in index:
+            index[name] = len(dictionary)
+            dictionary.append(str(name))
+        lookup[j] = index[name]
+    return lookup[inverse]
+
+
+def _code_dtype(dictionary):
+    """Smallest signed integer dtype that holds a code for every entry of dictionary."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if len(dictionary) <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.int64
+
+
+def _as_int(values, dtype, name):
+    values = np.asarray(values)
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(f"{name} values {values.min()}..{values.max()} do not fit {np.dtype(dtype).name}")
+    return values.astype(dtype)
+
+
+def _column(df, name, fill):
+    """df[name] with missing values as `fill`; all `fill` when the column is absent (it is optional in data_prep)."""
+    if name not in df.columns:
+        return np.full(len(df), fill, dtype=object)
+    return df[name].fillna(fill).to_numpy()
+
+
+def _csr_index(ids, phase, n_ids):
+    """Row order sorted by (id, phase) and offsets so rows of key id*3+phase are order[offsets[k]:offsets[k+1]]."""
+    key = ids.astype(np.int64) * N_PHASES + phase
+    order = np.argsort(key, kind='stable').astype(np.int32)
+    offsets = np.zeros(n_ids * N_PHASES + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key, minlength=n_ids * N_PHASES), out=offsets[1:])
+    return order, offsets
+
+
+def build_store(df, out_dir):
+    """
+    Write deliveries (the processed DataFrame) as a compact store in out_dir:
+    deliveries.arrow (uncompressed Arrow IPC, one record batch, so it can be memory
+    mapped without copies), dictionaries.json with the names behind every *_id column,
+    and by_bowler_* / by_batsman_* .npy row indexes keyed by (player id, phase).
+    """
+    from data_prep import phase_ids
+
+    os.makedirs(out_dir, exist_ok=True)
+    players, teams, kinds = [], [], []
+    cols = {}
+    for c in PLAYER_COLUMNS:
+        cols[f'{c}_id'] = encode(_column(df, c, 'none'), players)
+    for c in TEAM_COLUMNS:
+        cols[f'{c}_id'] = encode(_column(df, c, ''), teams)
+    cols['dismissal_kind_id'] = encode(_column(df, 'dismissal_kind', 'not_out'), kinds)
+    # narrowed once the dictionaries are complete; both team columns share one
+    for c in TEAM_COLUMNS:
+        cols[f'{c}_id'] = cols[f'{c}_id'].astype(_code_dtype(teams))
+    cols['dismissal_kind_id'] = cols['dismissal_kind_id'].astype(_code_dtype(kinds))
+    for c, dtype in INT_COLUMNS.items():
+        cols[c] = _as_int(df[c].to_numpy(), dtype, c)
+    for c in FLAG_COLUMNS:
+        if c in df.columns:
+            cols[c] = df[c].fillna(0).to_numpy().astype(np.int8)
+    cols['wicket'] = df['wicket'].to_numpy().astype(bool)
+    cols['phase'] = phase_ids(df['over'].to_numpy()).astype(np.int8)
+
+    arrays = {c: pa.array(v) for c, v in cols.items()}
+    dates = df['date'].to_numpy() if 'date' in df.columns else np.full(len(df), np.datetime64('NaT'))
+    arrays['date'] = pa.array(dates.astype('datetime64[D]'))
+    table = pa.table(arrays)
+    with pa.OSFile(os.path.join(out_dir, 'deliveries.arrow'), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=len(table) or None)
+
+    with open(os.path.join(out_dir, 'dictionaries.json'), 'w', encoding='utf-8') as f:
+        json.dump({'players': players, 'teams': teams, 'dismissal_kinds': kinds}, f)
+
+    for name, ids in (('bowler', cols['bowler_id']), ('batsman', cols['batsman_id'])):
+        order, offsets = _csr_index(ids, cols['phase'], len(players))
+        np.save(os.path.join(out_dir, f'by_{name}_order.npy'), order)
+        np.save(os.path.join(out_dir, f'by_{name}_offsets.npy'), offsets)
+    return table.nbytes
+
+
+class DeliveryStore:
+    """
+    Read side of build_store. The Arrow file and indexes are memory mapped, so opening a
+    store costs almost nothing and pages are shared between processes.
+
+    Player names are interned as ids (see `players`); bowler_rows()/batsman_rows() return
+    row numbers for one player, optionally in one phase, from the precomputed indexes
+    instead of filtering the whole table.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(os.path.join(path, 'deliveries.arrow'))).read_all()
+        with open(os.path.join(path, 'dictionaries.json'), encoding='utf-8') as f:
+            d = json.load(f)
+        self.players = d['players']
+        self.teams = d['teams']
+        self.dismissal_kinds = d['dismissal_kinds']
+        self.player_index = {p: i for i, p in enumerate(self.players)}
+        self._index = {name: (np.load(os.path.join(path, f'by_{name}_order.npy'), mmap_mode='r'),
+                              np.load(os.path.join(path, f'by_{name}_offsets.npy'), mmap_mode='r'))
+                       for name in ('bowler', 'batsman')}
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def player_id(self, name):
+        return self.player_index[name]
+
+    def column(self, name):
+        """NumPy view of one column (zero-copy for the integer and flag columns)."""
+        return self.table.column(name).chunk(0).to_numpy(zero_copy_only=False)
+
+    def _rows(self, index, player, phase):
+        order, offsets = self._index[index]
+        pid = self.player_id(player) if isinstance(player, str) else int(player)
+        if phase is None:
+            return order[offsets[pid * N_PHASES]:offsets[pid * N_PHASES + N_PHASES]]
+        k = pid * N_PHASES + int(phase)
+        return order[offsets[k]:offsets[k + 1]]
+
+    def bowler_rows(self, bowler, phase=None):
+        return self._rows('bowler', bowler, phase)
+
+    def batsman_rows(self, batsman, phase=None):
+        return self._rows('batsman', batsman, phase)
+
+    def batsman_list(self, n=12):
+        """First n batsmen in order of first appearance (what the simulator falls back to)."""
+        ids = self.column('batsman_id')
+        uniques, first = np.unique(ids, return_index=True)
+        return [self.players[i] for i in uniques[np.argsort(first)][:n]]
+
+    def to_pandas(self, rows=None, columns=None):
+        """Decode (a subset of) rows into a DataFrame with player and team names restored."""
+        table = self.table if columns is None else self.table.select(columns)
+        if rows is not None:
+            table = table.take(pa.array(np.asarray(rows)))
+        df = table.to_pandas()
+        names = {'players': np.array(self.players), 'teams': np.array(self.teams),
+                 'dismissal_kinds': np.array(self.dismissal_kinds)}
+        for c in list(df.columns):
+            if not c.endswith('_id') or c == 'match_id':
+                continue
+            base = c[:-3]
+            kind = 'players' if base in PLAYER_COLUMNS else 'teams' if base in TEAM_COLUMNS else 'dismissal_kinds'
+            df[base] = names[kind][df.pop(c).to_numpy()]
+        return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parquet', default='processed/deliveries_processed.parquet')
+    parser.add_argument('--out', default='processed/store')
+    args = parser.parse_args()
+
+    import pandas as pd
+    df = pd.read_parquet(args.parquet)
+    nbytes = build_store(df, args.out)
+    print(f"Saved delivery store → {args.out} ({len(df)} rows, {nbytes / 1e6:.1f} MB, "
+          f"DataFrame was {df.memory_usage(deep=True).sum() / 1e6:.1f} MB)")
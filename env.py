@@ -2,11 +2,18 @@ import gymnasium as gym
 import numpy as np
 
 class CricketEnv(gym.Env):
+    """
+    With one_bowler_per_over=True the bowler proposed at the start of an over bowls the
+    whole over; bowlers proposed mid-over are ignored and info['bowler_used'] names the
+    bowler that actually bowled.
+    """
 
-    def __init__(self, simulator, max_balls=120):
+    def __init__(self, simulator, max_balls=120, one_bowler_per_over=False):
         super().__init__()
         self.sim = simulator
         self.max_balls = max_balls
+        self.one_bowler_per_over = one_bowler_per_over
+        self._current_over_bowler = None
         
         self.observation_space = gym.spaces.Box(
             low=0, high=200,
@@ -20,9 +27,12 @@ class CricketEnv(gym.Env):
 
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed)
+        if seed is not None:
+            self.sim.seed(seed)
 
         self.sim.reset_match()
         self.last5 = [0] * 5
+        self._current_over_bowler = None
 
         obs = self._get_obs()
         info = {}
@@ -69,6 +79,12 @@ class CricketEnv(gym.Env):
             bowler_name = str(action)
             intent = 'normal'
 
+        if self.one_bowler_per_over:
+            if self.sim.balls_bowled % 6 == 0 or self._current_over_bowler is None:
+                self._current_over_bowler = bowler_name
+            else:
+                bowler_name = self._current_over_bowler
+
         outcome = self.sim.step({
             'bowler': bowler_name,
             'batting_intent': intent
@@ -82,6 +98,8 @@ class CricketEnv(gym.Env):
         truncated = False
 
         info = {'outcome': outcome}
+        if self.one_bowler_per_over:
+            info['bowler_used'] = self._current_over_bowler
 
         return obs, reward, done, truncated, info
 
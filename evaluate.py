@@ -1,120 +1,227 @@
-import gymnasium as gym
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
-class CricketEnv(gym.Env):
-
-    def __init__(self, simulator, max_balls=120):
-        super().__init__()
-        self.sim = simulator
-        self.max_balls = max_balls
-
-        self.observation_space = gym.spaces.Box(
-            low=0, high=200,
-            shape=(5 + 3 + 5,),
-            dtype=np.float32
-        )
-
-        self.action_space = gym.spaces.MultiDiscrete([10, 3])
-
-        self._current_over_bowler = None
-
-        self.reset()
-    def reset(self, *, seed=None, options=None):
-   
-        super().reset(seed=seed)
-
-        self.sim.reset_match()
-        self.last5 = [0] * 5
-        self._current_over_bowler = None  
-
-        obs = self._get_obs()
-        info = {}
-        return obs, info
-
-    def _get_obs(self):
-        s = self.sim._current_state()
-
-        over = s['over']
-        ball = s['ball']
-        score = s['score']
-        wickets = s['wickets']
-        balls_left = max(0, self.max_balls - s['balls_bowled'])
-
-        phase = s['phase']
-        phase_onehot = [
-            1 if phase == 'powerplay' else 0,
-            1 if phase == 'middle' else 0,
-            1 if phase == 'death' else 0
-        ]
-
-        obs = [
-            over, ball, score, wickets, balls_left
-        ] + phase_onehot + self.last5
-
-        return np.array(obs, dtype=np.float32)
-
-    def step(self, action):
-        """
-        Enforce: one bowler per over.
-        - If at start of an over (balls_bowled % 6 == 0) accept proposed bowler.
-        - Otherwise keep current over bowler and ignore proposed mid-over changes.
-        Returns (obs, reward, done, truncated, info) with info['outcome'] from simulator.
-        """
-
-        if isinstance(action, (list, tuple, np.ndarray)):
-            bowler_idx = int(action[0])
-            intent_idx = int(action[1]) if len(action) > 1 else 1
-            proposed_bowler = f"bowler_{bowler_idx}"
-            intent_map = {0: 'defensive', 1: 'normal', 2: 'aggressive'}
-            intent = intent_map.get(intent_idx, 'normal')
-        elif isinstance(action, dict):
-            proposed_bowler = action.get('bowler', 'bowler_0')
-            intent = action.get('batting_intent', 'normal')
-        else:
-            proposed_bowler = str(action)
-            intent = 'normal'
-
-        balls_bowled = getattr(self.sim, 'balls_bowled', 0)
-        ball_in_over = balls_bowled % 6
-
-        if ball_in_over == 0 or self._current_over_bowler is None:
-            self._current_over_bowler = proposed_bowler
-        else:
-            proposed_bowler = self._current_over_bowler
-
-        outcome = self.sim.step({
-            'bowler': proposed_bowler,
-            'batting_intent': intent
-        })
-
-        self.last5 = self.last5[1:] + [outcome.get('runs', 0)]
-
-        obs = self._get_obs()
-        reward = self._compute_reward(outcome)
-
-        done = bool(outcome.get('match_end', False))
-        truncated = False
-
-        info = {
-            'outcome': outcome,
-            'bowler_used': self._current_over_bowler
-        }
+from tables import load_tables
+from simulator import EmpiricalSimulator
+from env import CricketEnv
+
+N_BOWLERS = 10
+QUOTA = 4
+POLICIES = ['ppo', 'random', 'greedy', 'round_robin', 'dp']
+
+
+def phase_of_over(over):
+    return 0 if over < 6 else 1 if over < 16 else 2
+
+
+class RandomPolicy:
+    def reset(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def act(self, obs):
+        return [int(self.rng.integers(0, N_BOWLERS)), int(self.rng.integers(0, 3))]
 
-        return obs, reward, done, truncated, info
-
-    def _compute_reward(self, outcome):
-        r = -outcome.get('runs', 0)
-        if outcome.get('wicket', False):
-            r += 6
-        if outcome.get('runs', 0) == 0:
-            r += 1
-        return r
-
-    def render(self, mode='human'):
-        s = self.sim._current_state()
-        print(
-            f"Over: {s['over']}.{s['ball']}   "
-            f"Score: {s['score']}/{s['wickets']}   "
-            f"Balls bowled: {s['balls_bowled']}   "
-            f"Bowler this over: {self._current_over_bowler}"
-        )
+
+class RoundRobinPolicy:
+    def reset(self, seed):
+        pass
+
+    def act(self, obs):
+        return [int(obs[0]) % N_BOWLERS, 1]
+
+
+class GreedyEconomyPolicy:
+    """At the start of each over, the bowler with the fewest expected runs per ball in this phase
+    who has quota left and did not bowl the previous over."""
+
+    def __init__(self, tables):
+        rows = tables.slot_to_id(np.arange(N_BOWLERS))
+        probs = np.diff(tables.cdf[:, rows], axis=2, prepend=0.0)
+        self.economy = (probs * np.arange(7)).sum(axis=2)
+
+    def reset(self, seed):
+        self.overs = np.zeros(N_BOWLERS, dtype=np.int64)
+        self.current = -1
+
+    def act(self, obs):
+        if int(obs[1]) == 0 or self.current < 0:
+            cost = self.economy[phase_of_over(int(obs[0]))].copy()
+            cost[self.overs >= QUOTA] = np.inf
+            if self.current >= 0 and np.isfinite(np.delete(cost, self.current)).any():
+                cost[self.current] = np.inf
+            self.current = int(np.argmin(cost))
+            self.overs[self.current] += 1
+        return [self.current, 1]
+
+
+class ModelPolicy:
+    def __init__(self, model):
+        self.model = model
+
+    def reset(self, seed):
+        pass
+
+    def act(self, obs):
+        action, _ = self.model.predict(obs, deterministic=True)
+        return [int(a) for a in np.ravel(action)[:2]]
+
+
+def make_policy(name, tables, policy_path):
+    if name == 'random':
+        return RandomPolicy()
+    if name == 'round_robin':
+        return RoundRobinPolicy()
+    if name == 'greedy':
+        return GreedyEconomyPolicy(tables)
+    if name == 'dp':
+        from planner import solve
+        return ModelPolicy(solve(tables))
+    if name == 'ppo':
+        if policy_path.endswith('.zip'):
+            from stable_baselines3 import PPO
+            return ModelPolicy(PPO.load(policy_path, device='cpu'))
+        from numpy_policy import NumpyPolicy
+        return ModelPolicy(NumpyPolicy.load(policy_path))
+    raise ValueError(f"unknown policy: {name}")
+
+
+_worker = {}
+
+
+def _init_worker(config):
+    """Build the env and policies once per process."""
+    tables = load_tables(config['empirical'], config['mappings'])
+    sim = EmpiricalSimulator(None, tables)
+    _worker['env'] = CricketEnv(sim, one_bowler_per_over=config['one_bowler_per_over'])
+    _worker['policies'] = {name: make_policy(name, tables, config['policy_path']) for name in config['policies']}
+
+
+def play_innings(env, policy, seed, render=False):
+    """One innings from `seed`: (runs, wickets, reward, balls bowled per slot)."""
+    obs, _ = env.reset(seed=seed)
+    policy.reset(seed)
+    usage = np.zeros(N_BOWLERS, dtype=np.int64)
+    reward = 0.0
+    done = False
+    while not done:
+        bowler, intent = policy.act(obs)
+        obs, r, done, _, info = env.step([bowler, intent])
+        used = int(info['bowler_used'].split('_')[1]) if 'bowler_used' in info else bowler
+        usage[min(used, N_BOWLERS - 1)] += 1
+        reward += r
+        if render:
+            env.render()
+    return env.sim.score, env.sim.wickets, reward, usage
+
+
+def _run_chunk(task):
+    name, seeds = task
+    env, policy = _worker['env'], _worker['policies'][name]
+    runs, wickets, reward, usage = zip(*(play_innings(env, policy, int(s)) for s in seeds))
+    return name, np.array(runs), np.array(wickets), np.array(reward), np.stack(usage)
+
+
+def bootstrap_ci(x, n_boot=1000, alpha=0.05, seed=0, batch=100):
+    """Percentile bootstrap interval for the mean of x."""
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float64)
+    means = np.concatenate([x[rng.integers(0, len(x), (min(batch, n_boot - i), len(x)))].mean(axis=1)
+                            for i in range(0, n_boot, batch)])
+    return [float(v) for v in np.percentile(means, [100 * alpha / 2, 100 * (1 - alpha / 2)])]
+
+
+def summarise(x, n_boot):
+    x = np.asarray(x, dtype=np.float64)
+    p5, p50, p95 = np.percentile(x, [5, 50, 95])
+    return {'mean': float(x.mean()), 'ci95': bootstrap_ci(x, n_boot), 'std': float(x.std()),
+            'p5': float(p5), 'p50': float(p50), 'p95': float(p95)}
+
+
+def evaluate(config, n_innings, seed=0, workers=1, chunk_size=250, n_boot=1000):
+    """
+    Play n_innings per policy with per-innings seeds seed, seed+1, ...; every policy sees
+    the same seeds, and any innings can be replayed alone from its seed.
+    """
+    seeds = seed + np.arange(n_innings)
+    tasks = [(name, seeds[i:i + chunk_size]) for name in config['policies'] for i in range(0, n_innings, chunk_size)]
+
+    t0 = time.perf_counter()
+    if workers <= 1:
+        _init_worker(config)
+        chunks = [_run_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(config,)) as pool:
+            chunks = list(pool.map(_run_chunk, tasks))
+    elapsed = time.perf_counter() - t0
+
+    slot_names = load_tables(config['empirical'], config['mappings']).slot_names
+    results = {}
+    for name in config['policies']:
+        parts = [c[1:] for c in chunks if c[0] == name]
+        runs, wickets, reward, usage = (np.concatenate(p) for p in zip(*parts))
+        results[name] = {
+            'innings': int(len(runs)),
+            'runs': summarise(runs, n_boot),
+            'wickets': summarise(wickets, n_boot),
+            'reward': summarise(reward, n_boot),
+            'bowler_usage': {str(slot_names[i]) if i < len(slot_names) else f"bowler_{i}": float(u)
+                             for i, u in enumerate(usage.mean(axis=0))},
+        }
+    return {
+        'config': dict(config, innings=n_innings, seed=seed, workers=workers),
+        'elapsed_s': round(elapsed, 2),
+        'innings_per_sec': round(n_innings * len(config['policies']) / elapsed, 1),
+        'policies': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--policy-path', default='models/ppo_cricket_policy.npz', help='.npz export or SB3 .zip')
+    parser.add_argument('--policies', nargs='+', choices=POLICIES, default=['ppo', 'random', 'greedy', 'round_robin'])
+    parser.add_argument('--innings', type=int, default=10000, help='innings per policy')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--bootstrap', type=int, default=1000, help='bootstrap resamples for the 95%% CIs')
+    parser.add_argument('--one-bowler-per-over', action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument('--out', default='results/evaluation.json')
+    parser.add_argument('--replay', type=int, default=None, help='play and render the innings with this seed')
+    args = parser.parse_args()
+
+    config = {
+        'empirical': args.empirical,
+        'mappings': args.mappings,
+        'policy_path': args.policy_path,
+        'policies': args.policies,
+        'one_bowler_per_over': args.one_bowler_per_over,
+    }
+
+    if args.replay is not None:
+        _init_worker(config)
+        for name in args.policies:
+            print(f"--- {name}, seed {args.replay}")
+            runs, wickets, reward, _ = play_innings(_worker['env'], _worker['policies'][name], args.replay, render=True)
+            print(f"{name}: {runs}/{wickets}, reward {reward:.0f}")
+        raise SystemExit
+
+    report = evaluate(config, args.innings, seed=args.seed, workers=args.workers, n_boot=args.bootstrap)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'policy':12s} {'runs':>7s} {'95% CI':>15s} {'p5-p95':>9s} {'wkts':>5s} {'reward':>7s}")
+    for name, r in report['policies'].items():
+        lo, hi = r['runs']['ci95']
+        print(f"{name:12s} {r['runs']['mean']:7.1f} {f'[{lo:.1f}, {hi:.1f}]':>15s} "
+              f"{r['runs']['p5']:4.0f}-{r['runs']['p95']:<4.0f} {r['wickets']['mean']:5.2f} {r['reward']['mean']:7.1f}")
+    print(f"{args.innings} innings x {len(args.policies)} policies in {report['elapsed_s']}s "
+          f"({report['innings_per_sec']} innings/s, {args.workers} workers)")
+    print(f"Saved results → {args.out}")
@@ -0,0 +1,74 @@
+import argparse
+import numpy as np
+import torch.nn as nn
+from stable_baselines3 import PPO
+
+from numpy_policy import NumpyPolicy
+
+ACTIVATION_NAMES = {nn.Tanh: 'tanh', nn.ReLU: 'relu'}
+
+
+def export_policy(model):
+    """Pull the actor MLP and action head out of an SB3 PPO model."""
+    policy = model.policy
+    weights, biases, activations = [], [], []
+    for layer in policy.mlp_extractor.policy_net:
+        if isinstance(layer, nn.Linear):
+            weights.append(layer.weight.detach().cpu().numpy().T.copy())
+            biases.append(layer.bias.detach().cpu().numpy().copy())
+            activations.append('identity')
+        else:
+            activations[-1] = ACTIVATION_NAMES[type(layer)]
+
+    head = policy.action_net
+    weights.append(head.weight.detach().cpu().numpy().T.copy())
+    biases.append(head.bias.detach().cpu().numpy().copy())
+    activations.append('identity')
+
+    action_dims = list(model.action_space.nvec)
+    return NumpyPolicy(weights, biases, activations, action_dims)
+
+
+def sample_observations(n, seed=0):
+    """Random (n, 13) observations in the env's value ranges."""
+    rng = np.random.default_rng(seed)
+    over = rng.integers(0, 20, n)
+    obs = np.zeros((n, 13), dtype=np.float32)
+    obs[:, 0] = over
+    obs[:, 1] = rng.integers(0, 6, n)
+    obs[:, 2] = rng.integers(0, 250, n)
+    obs[:, 3] = rng.integers(0, 10, n)
+    obs[:, 4] = 120 - (over * 6 + obs[:, 1])
+    obs[np.arange(n), 5 + np.where(over < 6, 0, np.where(over < 16, 1, 2))] = 1
+    obs[:, 8:] = rng.choice([0, 1, 2, 3, 4, 6], (n, 5))
+    return obs
+
+
+def check_parity(model, policy, n=10000, seed=0):
+    """Compare deterministic actions with SB3 on random observations in the env's value ranges."""
+    obs = sample_observations(n, seed)
+    expected, _ = model.predict(obs, deterministic=True)
+    actual, _ = policy.predict(obs, deterministic=True)
+    single, _ = policy.predict(obs[0], deterministic=True)
+    assert np.array_equal(single, expected[0]), "single-observation prediction differs"
+    return float((actual == expected).all(axis=1).mean())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='models/ppo_cricket.zip')
+    parser.add_argument('--out', default='models/ppo_cricket_policy.npz')
+    parser.add_argument('--check', type=int, default=10000, help='observations for the SB3 parity check (0 to skip)')
+    args = parser.parse_args()
+
+    model = PPO.load(args.model, device='cpu')
+    policy = export_policy(model)
+    policy.save(args.out)
+    print(f"Saved NumPy policy → {args.out}")
+
+    if args.check:
+        exported = NumpyPolicy.load(args.out)
+        agreement = check_parity(model, exported, n=args.check)
+        print(f"Parity with SB3 on {args.check} observations: {agreement:.4%}")
+        if agreement < 1.0:
+            raise SystemExit("exported policy disagrees with SB3")
@@ -0,0 +1,121 @@
+import time
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class BatchedPredictor:
+    """
+    Collects observations from concurrent callers and runs them through the policy
+    in one forward pass.
+
+    A background thread takes the first pending request, then keeps gathering more
+    until `max_batch_size` observations are queued or `max_wait_ms` has passed.
+    predict() has the same contract as PPO.predict for deterministic actions and
+    accepts a single (13,) observation or a (k, 13) batch.
+
+    Callers that predict in a loop (one innings) can wrap it in session(); once every
+    open session has a request queued the batch is flushed without waiting further,
+    so a lone simulation does not pay max_wait_ms on every ball.
+    """
+
+    def __init__(self, model, max_batch_size=64, max_wait_ms=2.0, history=1000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=history)
+        self._queue_waits = deque(maxlen=history)
+        self.batches = 0
+        self.requests = 0
+        self.observations = 0
+        self._active = 0
+        self._thread = threading.Thread(target=self._run, name="batched-predictor", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def session(self):
+        with self._lock:
+            self._active += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def predict(self, obs, deterministic=True):
+        if not deterministic:
+            return self.model.predict(obs, deterministic=False)
+
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.ndim == 1
+        future = Future()
+        self._queue.put((obs.reshape(1, -1) if single else obs, future, time.perf_counter()))
+        actions = future.result()
+        return (actions[0] if single else actions), None
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            if 0 < self._active <= len(pending):
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending, size
+
+    def _run(self):
+        while True:
+            pending, size = self._collect()
+            started = time.perf_counter()
+            try:
+                actions, _ = self.model.predict(np.concatenate([p[0] for p in pending]), deterministic=True)
+                actions = np.asarray(actions).reshape(size, -1)
+            except Exception as e:
+                for _, future, _ in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for obs, future, _ in pending:
+                future.set_result(actions[offset:offset + len(obs)])
+                offset += len(obs)
+
+            with self._lock:
+                self.batches += 1
+                self.requests += len(pending)
+                self.observations += size
+                self._batch_sizes.append(size)
+                self._queue_waits.extend((started - p[2]) * 1000 for p in pending)
+
+    def stats(self):
+        with self._lock:
+            sizes = np.asarray(self._batch_sizes, dtype=np.float64)
+            waits = np.asarray(self._queue_waits, dtype=np.float64)
+            out = {
+                'batches': self.batches,
+                'requests': self.requests,
+                'observations': self.observations,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+        if len(sizes):
+            out['batch_size'] = {'mean': float(sizes.mean()), 'p50': float(np.percentile(sizes, 50)),
+                                 'max': float(sizes.max())}
+        if len(waits):
+            out['queue_wait_ms'] = {'mean': float(waits.mean()), 'p50': float(np.percentile(waits, 50)),
+                                    'p99': float(np.percentile(waits, 99))}
+        return out
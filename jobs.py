@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from sweep import CHUNK_SIZE, parse_scenario, tasks
+from projection import summarise_counts
+
+JOBS_DIR = 'results/jobs'
+MAX_JOB_INNINGS = 50_000_000
+MAX_CHUNK_SIZE = 10 * CHUNK_SIZE
+MAX_SCORE = 1024
+MAX_BATSMEN = 12
+FINISHED = ('done', 'cancelled', 'failed')
+
+log = logging.getLogger(__name__)
+
+
+def _write_atomic(path, write):
+    """write(f) into a temporary file, then rename it over path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class Job:
+    """
+    One simulation job: scenarios (as in sweep.py) played in chunks of innings.
+
+    Per scenario it keeps mergeable aggregates (counts of final totals and of wickets,
+    summed runs per batting position) plus the set of finished chunks, and persists
+    them to <dir>/state.npz after every chunk. Chunk seeds depend only on the scenario
+    seed and chunk index, so a job resumed after a restart on the same tables gives the
+    same result as an uninterrupted one. The tables version the chunks ran on is kept in
+    job.json; a job that finds other tables starts over (see JobQueue._run).
+    """
+
+    def __init__(self, job_id, scenarios, chunk_size, path, created=None):
+        self.id = job_id
+        self.scenarios = scenarios
+        self.chunk_size = chunk_size
+        self.path = path
+        self.created = created or time.time()
+        self.tasks = list(tasks(scenarios, chunk_size))
+        n = len(scenarios)
+        self.score_counts = np.zeros((n, MAX_SCORE), dtype=np.int64)
+        self.wicket_counts = np.zeros((n, 11), dtype=np.int64)
+        self.batsmen_runs = np.zeros((n, MAX_BATSMEN), dtype=np.int64)
+        self.chunk_done = np.zeros(len(self.tasks), dtype=bool)
+        self.tables_version = None
+        self.status = 'queued'
+        self.error = None
+        self.cancel_requested = False
+        self.started = self.finished = None
+        self.session_innings = 0
+        self.default_order = []  # batting order of scenarios that give none (the tables' batsman_list)
+        self.lock = threading.Lock()
+
+    @property
+    def innings_total(self):
+        return sum(s['innings'] for s in self.scenarios)
+
+    def innings_done(self):
+        return int(self.score_counts.sum())
+
+    def add(self, k, result):
+        i, score, wickets, batsmen = result
+        with self.lock:
+            self.score_counts[i] += np.bincount(np.minimum(score, MAX_SCORE - 1), minlength=MAX_SCORE)
+            self.wicket_counts[i] += np.bincount(np.minimum(wickets, 10), minlength=11)
+            self.batsmen_runs[i] += batsmen.sum(axis=0)
+            self.chunk_done[k] = True
+            self.session_innings += len(score)
+
+    def reset(self):
+        """Drop every finished chunk, e.g. when they ran on tables that have since changed."""
+        with self.lock:
+            self.score_counts[:] = 0
+            self.wicket_counts[:] = 0
+            self.batsmen_runs[:] = 0
+            self.chunk_done[:] = False
+            self.session_innings = 0
+
+    def save(self):
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            _write_atomic(os.path.join(self.path, 'state.npz'), lambda f: np.savez(
+                f, score_counts=self.score_counts, wicket_counts=self.wicket_counts,
+                batsmen_runs=self.batsmen_runs, chunk_done=self.chunk_done))
+            meta = {'id': self.id, 'scenarios': self.scenarios, 'chunk_size': self.chunk_size,
+                    'created': self.created, 'status': self.status, 'error': self.error,
+                    'finished': self.finished, 'tables_version': self.tables_version}
+            _write_atomic(os.path.join(self.path, 'job.json'), lambda f: f.write(json.dumps(meta).encode()))
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'job.json')) as f:
+            meta = json.load(f)
+        job = cls(meta['id'], meta['scenarios'], meta['chunk_size'], path, meta['created'])
+        job.status, job.error, job.finished = meta['status'], meta['error'], meta.get('finished')
+        job.tables_version = meta.get('tables_version')
+        state_path = os.path.join(path, 'state.npz')
+        if os.path.exists(state_path):
+            with np.load(state_path) as z:
+                job.score_counts, job.wicket_counts = z['score_counts'], z['wicket_counts']
+                job.batsmen_runs, job.chunk_done = z['batsmen_runs'], z['chunk_done']
+        return job
+
+    def results(self):
+        """Summary per scenario of the chunks finished so far (same shape as a /sweep result)."""
+        out = []
+        with self.lock:
+            for i, s in enumerate(self.scenarios):
+                n = int(self.score_counts[i].sum())
+                entry = {'name': s['name'], 'policy': s['policy'], 'innings_done': n}
+                if n:
+                    entry.update(summarise_counts(self.score_counts[i], self.wicket_counts[i], s['target']))
+                    order = s['batting_order'] or self.default_order
+                    entry['batsmen_runs'] = {str(order[j]) if j < len(order) else f"batsman_{j + 1}": float(r) / n
+                                             for j, r in enumerate(self.batsmen_runs[i])}
+                out.append(entry)
+        return out
+
+    def status_dict(self, with_results=True):
+        done = self.innings_done()
+        elapsed = ((self.finished if self.status in FINISHED and self.finished else time.time()) - self.started
+                   if self.started else 0.0)
+        d = {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'created': self.created,
+            'chunks_done': int(self.chunk_done.sum()),
+            'chunks_total': len(self.tasks),
+            'innings_done': done,
+            'innings_total': self.innings_total,
+            'tables_version': self.tables_version,
+            # throughput of this process's run, so a resumed job is not credited with earlier chunks
+            'innings_per_sec': round(self.session_innings / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        if with_results:
+            d['results'] = self.results()
+        return d
+
+
+class JobQueue:
+    """
+    Runs jobs in FIFO order, at most `max_running` at a time, each with up to `max_inflight`
+    chunks submitted to the runner (sweep.SweepRunner, or a callable returning the current
+    one) at once. Unfinished jobs found in `jobs_dir` are resumed on start.
+    """
+
+    def __init__(self, runner, jobs_dir=JOBS_DIR, max_running=2, max_inflight=None):
+        self._runner = runner if callable(runner) else (lambda: runner)
+        self.jobs_dir = jobs_dir
+        self.max_running = max_running
+        self.max_inflight = max_inflight
+        self.jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        for name in sorted(os.listdir(jobs_dir), key=lambda n: os.path.getmtime(os.path.join(jobs_dir, n))):
+            path = os.path.join(jobs_dir, name)
+            if not os.path.exists(os.path.join(path, 'job.json')):
+                continue
+            job = Job.load(path)
+            job.default_order = self._default_order()
+            self.jobs[job.id] = job
+            if job.status not in FINISHED:
+                job.status = 'queued'
+                self._queue.put(job)
+
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max_running)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, scenarios, chunk_size=None):
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ValueError("scenarios must be a non-empty list")
+        chunk_size = CHUNK_SIZE if chunk_size is None else int(chunk_size)
+        if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk_size must be 1..{MAX_CHUNK_SIZE}, got {chunk_size}")
+        scenarios = [parse_scenario(s, i) for i, s in enumerate(scenarios)]
+        total = sum(s['innings'] for s in scenarios)
+        if total > MAX_JOB_INNINGS:
+            raise ValueError(f"{total} innings requested, limit is {MAX_JOB_INNINGS}")
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(job_id, scenarios, chunk_size, os.path.join(self.jobs_dir, job_id))
+        job.default_order = self._default_order()
+        job.save()
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put(job)
+        return job
+
+    def _default_order(self):
+        return list(getattr(self._runner(), 'batsman_list', []))
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [j.status_dict(with_results=False) for j in sorted(self.jobs.values(), key=lambda j: j.created)]
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_requested = True
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished = time.time()
+            job.save()
+        return job
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job.status != 'queued' or job.cancel_requested:
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                job.status, job.error = 'failed', str(e)
+            job.finished = time.time()
+            job.save()
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started = time.time()
+        job.session_innings = 0
+        job.save()
+        while not self._run_on(job, self._runner()):
+            pass
+        job.status = 'cancelled' if job.cancel_requested and not job.chunk_done.all() else 'done'
+
+    def _run_on(self, job, runner):
+        """
+        Play the job's unfinished chunks on one runner. Chunks that ran on other tables are
+        dropped first. Returns False when the runner was replaced (the tables reloaded)
+        before the job finished; the caller then continues on the new one.
+        """
+        version = getattr(runner, 'version', None)
+        if job.tables_version != version:
+            if job.chunk_done.any():
+                log.info("job %s: tables changed (%s → %s), starting over", job.id, job.tables_version, version)
+                job.reset()
+            job.tables_version = version
+            job.save()
+        inflight = self.max_inflight or max(2, 2 * runner.workers)
+        todo = iter(np.flatnonzero(~job.chunk_done).tolist())
+        pending = {}
+        current = True
+        while True:
+            while current and not job.cancel_requested and len(pending) < inflight:
+                k = next(todo, None)
+                if k is None:
+                    break
+                current = self._runner() is runner
+                if current:
+                    try:
+                        pending[runner.submit(job.tasks[k])] = k
+                    except RuntimeError:  # shut down by a reload since the check above
+                        current = False
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in finished:
+                job.add(pending.pop(f), f.result())
+            job.save()
+        return current or job.cancel_requested
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run simulation jobs without the web app.')
+    parser.add_argument('command', choices=['run', 'resume', 'list'])
+    parser.add_argument('scenarios', nargs='?', help='JSON file with a list of scenarios (for run)')
+    parser.add_argument('--jobs-dir', default=JOBS_DIR)
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--policy', default='models/ppo_cricket_policy.npz')
+    parser.add_argument('--matchups', default='processed/matchup_tables.npz', help='used when the file exists')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'list':
+        for name in sorted(os.listdir(args.jobs_dir)) if os.path.isdir(args.jobs_dir) else []:
+            d = Job.load(os.path.join(args.jobs_dir, name)).status_dict(with_results=False)
+            print(f"{d['id']}  {d['status']:9s} {d['innings_done']}/{d['innings_total']} innings")
+        raise SystemExit
+
+    from tables import load_tables
+    from numpy_policy import NumpyPolicy
+    from matchups import MatchupTables
+    from sweep import SweepRunner
+    from utils import file_version
+
+    tables = load_tables(args.empirical, args.mappings)
+    policy = NumpyPolicy.load(args.policy) if os.path.exists(args.policy) else None
+    matchups = MatchupTables.load(args.matchups) if os.path.exists(args.matchups) else None
+    runner = SweepRunner(tables, policy, matchups, workers=args.workers, version=file_version(args.empirical))
+    jobs = JobQueue(runner, args.jobs_dir, max_running=1)
+    if args.command == 'run':
+        with open(args.scenarios) as f:
+            job = jobs.submit(json.load(f), args.chunk_size)
+        print(f"Job {job.id} → {job.path}")
+    active = [j for j in jobs.jobs.values() if j.status not in FINISHED]
+
+    try:
+        while any(j.status not in FINISHED for j in active):
+            for j in active:
+                if j.status == 'running':
+                    d = j.status_dict(with_results=False)
+                    print(f"\r{j.id}: {d['innings_done']}/{d['innings_total']} innings, "
+                          f"{d['innings_per_sec']:.0f}/s", end='', flush=True)
+            time.sleep(0.5)
+    finally:
+        runner.close()
+    print()
+    for j in active:
+        print(f"{j.id}: {j.status}{f' ({j.error})' if j.error else ''}")
+        for r in j.results():
+            if r['innings_done']:
+                print(f"  {r['name']:20s} {r['final_score']['mean']:6.1f} wkts {r['wickets']['mean']:.2f}")
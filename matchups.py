@@ -0,0 +1,212 @@
+import os
+import argparse
+from bisect import bisect_right
+from functools import cached_property
+
+import numpy as np
+
+from tables import PHASES
+from delivery_store import encode
+
+N_PHASES = len(PHASES)
+ID_BITS = 20
+
+
+def pack(phase, bowler_id, batter_id):
+    return (np.asarray(phase, dtype=np.int64) << (2 * ID_BITS)) | \
+           (np.asarray(bowler_id, dtype=np.int64) << ID_BITS) | np.asarray(batter_id, dtype=np.int64)
+
+
+def unpack(keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    mask = (1 << ID_BITS) - 1
+    return keys >> (2 * ID_BITS), (keys >> ID_BITS) & mask, keys & mask
+
+
+class MatchupCounter:
+    """
+    Sparse delivery counts per (phase, bowler, batter): only observed matchups are kept,
+    as sorted packed keys with a runs histogram and a wicket count each. Chunks are
+    counted as they are added and merged once, in counts().
+    """
+
+    def __init__(self):
+        self.bowlers = []
+        self.batters = []
+        self._chunks = []
+
+    def add(self, phase_ids, bowlers, batters, runs_bucket, wicket):
+        keys = pack(phase_ids, encode(bowlers, self.bowlers), encode(batters, self.batters))
+        runs = np.clip(np.asarray(runs_bucket, dtype=np.int64), 0, 6)
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        run_counts = np.bincount(inverse * 7 + runs, minlength=len(uniq) * 7).reshape(-1, 7)
+        wicket_counts = np.bincount(inverse, weights=np.asarray(wicket, dtype=np.int64),
+                                    minlength=len(uniq)).astype(np.int64)
+        self._chunks.append((uniq, run_counts, wicket_counts))
+
+    def counts(self):
+        """(sorted keys, run_counts (k, 7), wicket_counts (k,)) over everything added so far."""
+        if not self._chunks:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 7), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if len(self._chunks) > 1:
+            keys, run_counts, wicket_counts = (np.concatenate(p) for p in zip(*self._chunks))
+            uniq, inverse = np.unique(keys, return_inverse=True)
+            merged = np.stack([np.bincount(inverse, weights=run_counts[:, j], minlength=len(uniq))
+                               for j in range(7)], axis=1).astype(np.int64)
+            wickets = np.bincount(inverse, weights=wicket_counts, minlength=len(uniq)).astype(np.int64)
+            self._chunks = [(uniq, merged, wickets)]
+        return self._chunks[0]
+
+    def to_tables(self, prior_balls=30, min_balls=6):
+        """
+        Resolve the backoff: each (phase, bowler) distribution is shrunk towards its phase
+        with the weight of `prior_balls` deliveries, and each (phase, bowler, batter) with at
+        least `min_balls` deliveries towards its (phase, bowler) the same way. Rarer
+        matchups are left out and use the (phase, bowler) row.
+        """
+        nb = len(self.bowlers)
+        keys, run_counts, wicket_counts = self.counts()
+        phase, bowler, _ = unpack(keys)
+
+        phase_runs = np.zeros((N_PHASES, 7))
+        np.add.at(phase_runs, phase, run_counts)
+        phase_wkts = np.bincount(phase, weights=wicket_counts, minlength=N_PHASES)
+        phase_n = np.maximum(phase_runs.sum(axis=1), 1)
+        phase_p = phase_runs / phase_n[:, None]
+        phase_w = phase_wkts / phase_n
+
+        pb_runs = np.zeros((N_PHASES, nb + 1, 7))
+        np.add.at(pb_runs, (phase, bowler), run_counts)
+        pb_wkts = np.zeros((N_PHASES, nb + 1))
+        np.add.at(pb_wkts, (phase, bowler), wicket_counts)
+        pb_n = pb_runs.sum(axis=2)
+        base_p = (pb_runs + prior_balls * phase_p[:, None, :]) / (pb_n + prior_balls)[..., None]
+        base_w = (pb_wkts + prior_balls * phase_w[:, None]) / (pb_n + prior_balls)
+
+        n = run_counts.sum(axis=1)
+        keep = n >= min_balls
+        parent_p, parent_w = base_p[phase[keep], bowler[keep]], base_w[phase[keep], bowler[keep]]
+        p = (run_counts[keep] + prior_balls * parent_p) / (n[keep] + prior_balls)[:, None]
+        w = (wicket_counts[keep] + prior_balls * parent_w) / (n[keep] + prior_balls)
+
+        return MatchupTables(np.cumsum(base_p, axis=2), base_w, keys[keep], np.cumsum(p, axis=1), w,
+                             self.bowlers, self.batters)
+
+
+def build_matchups(df, prior_balls=30, min_balls=6):
+    """MatchupTables from processed deliveries (data_prep output)."""
+    from data_prep import phase_ids
+    counter = MatchupCounter()
+    counter.add(phase_ids(df['over'].to_numpy()), df['bowler'].fillna('none').to_numpy(),
+                df['batsman'].fillna('none').to_numpy(), df['total_runs'].to_numpy(), df['wicket'].to_numpy())
+    return counter.to_tables(prior_balls, min_balls)
+
+
+class MatchupTables:
+    """
+    Outcome distributions per (phase, bowler, batter) with the backoff already resolved.
+
+    base_cdf[phase, bowler] holds the (phase, bowler) rows plus a last row per phase
+    (bowler == n_bowlers) with the phase-wide distribution for unknown bowlers; keys/cdf
+    hold the matchups seen often enough, as sorted packed keys. Both levels are stacked
+    into one cdf array: a (phase, bowler, batter) lookup finds its key by binary search
+    and otherwise falls back to the (phase, bowler) row, so memory grows with the observed
+    matchups rather than bowlers x batters. Unknown batters use id n_batters.
+    """
+
+    def __init__(self, base_cdf, base_wicket, keys, cdf, wicket_prob, bowler_names, batter_names, resolved=None):
+        self.base_cdf = np.asarray(base_cdf, dtype=np.float64)
+        self.base_wicket = np.asarray(base_wicket, dtype=np.float64)
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.matchup_cdf = np.asarray(cdf, dtype=np.float64)
+        self.matchup_wicket = np.asarray(wicket_prob, dtype=np.float64)
+        self.bowler_names = [str(b) for b in bowler_names]
+        self.batter_names = [str(b) for b in batter_names]
+        self.bowler_index = {b: i for i, b in enumerate(self.bowler_names)}
+        self.batter_index = {b: i for i, b in enumerate(self.batter_names)}
+
+        if resolved is not None:
+            # cdf and wicket_prob as built below, e.g. views of shared memory (see shared.py)
+            self.cdf, self.wicket_prob = resolved['cdf'], resolved['wicket_prob']
+            return
+        self.cdf = np.concatenate([self.base_cdf.reshape(-1, 7), self.matchup_cdf])
+        self.cdf /= self.cdf[:, -1:]
+        self.wicket_prob = np.concatenate([self.base_wicket.reshape(-1), self.matchup_wicket])
+
+    @property
+    def n_base_rows(self):
+        return N_PHASES * (len(self.bowler_names) + 1)
+
+    @cached_property
+    def _row_index(self):
+        # per-ball sampling looks keys up in a dict, cheaper than a binary search from Python
+        return dict(zip(self.keys.tolist(), range(self.n_base_rows, self.n_base_rows + len(self.keys))))
+
+    @cached_property
+    def _cdf_rows(self):
+        # per-ball sampling bisects plain lists, which beats np.searchsorted on 7 floats
+        return self.cdf.tolist()
+
+    @cached_property
+    def _wicket_rows(self):
+        return self.wicket_prob.tolist()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z['base_cdf'], z['base_wicket'], z['keys'], z['cdf'], z['wicket_prob'],
+                       z['bowler_names'], z['batter_names'])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, base_cdf=self.base_cdf, base_wicket=self.base_wicket, keys=self.keys,
+                 cdf=self.matchup_cdf, wicket_prob=self.matchup_wicket,
+                 bowler_names=np.array(self.bowler_names, dtype=str),
+                 batter_names=np.array(self.batter_names, dtype=str))
+        os.replace(tmp_path, path)
+
+    def bowler_id(self, name):
+        return self.bowler_index.get(name, len(self.bowler_names))
+
+    def batter_id(self, name):
+        return self.batter_index.get(name, len(self.batter_names))
+
+    def sample(self, phase_id, bowler_id, batter_id, rng):
+        key = (phase_id << (2 * ID_BITS)) | (bowler_id << ID_BITS) | batter_id
+        row = self._row_index.get(key, phase_id * (len(self.bowler_names) + 1) + bowler_id)
+        runs = bisect_right(self._cdf_rows[row], rng.random())
+        wicket = rng.random() < self._wicket_rows[row]
+        return min(runs, 6), wicket
+
+    def rows(self, phase_ids, bowler_ids, batter_ids):
+        """cdf/wicket_prob rows for arrays of ids: the matchup row when there is one, else (phase, bowler)."""
+        phase_ids, bowler_ids = np.asarray(phase_ids, dtype=np.int64), np.asarray(bowler_ids, dtype=np.int64)
+        base = phase_ids * (len(self.bowler_names) + 1) + bowler_ids
+        if not len(self.keys):
+            return base
+        keys = pack(phase_ids, bowler_ids, batter_ids)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, self.n_base_rows + pos, base)
+
+
+def load_matchups(path):
+    """Accepts a saved .npz, an already loaded MatchupTables, or None."""
+    if path is None or isinstance(path, MatchupTables):
+        return path
+    return MatchupTables.load(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='processed/deliveries_processed.parquet')
+    parser.add_argument('--out', default='processed/matchup_tables.npz')
+    parser.add_argument('--prior-balls', type=float, default=30)
+    parser.add_argument('--min-balls', type=int, default=6)
+    args = parser.parse_args()
+
+    import pandas as pd
+    df = pd.read_parquet(args.data, columns=['over', 'bowler', 'batsman', 'total_runs', 'wicket'])
+    tables = build_matchups(df, args.prior_balls, args.min_balls)
+    tables.save(args.out)
+    print(f"Saved matchup tables → {args.out}: {len(tables.bowler_names)} bowlers, {len(tables.batter_names)} batters, "
+          f"{len(tables.keys)} (phase, bowler, batter) matchups")
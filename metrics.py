@@ -0,0 +1,123 @@
+import time
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds; covers a ~50 µs sample_ball up to a multi-second projection.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestTimer:
+    """Per-request stage totals; a stage timed once per ball accumulates over the innings."""
+
+    def __init__(self):
+        self.stages = {}
+        self.start = time.perf_counter()
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self):
+        parts = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in self.stages.items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class _NullTimer:
+    stages = {}
+
+    def add(self, stage, seconds):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Stage-latency histograms and request counters in the Prometheus text format.
+
+    Each request gets a RequestTimer; record() folds its stage totals into one
+    histogram per (endpoint, stage), so the hot path only pays for a dict update.
+    With enabled=False timer() hands out a shared no-op timer and record() returns
+    immediately.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS, prefix='cricket'):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = []
+
+    def timer(self):
+        return RequestTimer() if self.enabled else NULL_TIMER
+
+    def record(self, endpoint, timer, status):
+        if timer is NULL_TIMER:
+            return
+        total = time.perf_counter() - timer.start
+        with self._lock:
+            for stage, seconds in list(timer.stages.items()) + [('total', total)]:
+                hist = self._histograms.get((endpoint, stage))
+                if hist is None:
+                    hist = self._histograms[(endpoint, stage)] = Histogram(self.buckets)
+                hist.observe(seconds)
+            key = (endpoint, str(status))
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def gauge(self, name, help_text, fn):
+        """fn() returns a number or {((label, value), ...): number}; it is called at render time."""
+        self._gauges.append((name, help_text, fn, 'gauge'))
+
+    def counter(self, name, help_text, fn):
+        """Like gauge(), for a cumulative count kept elsewhere; rendered as <name>_total."""
+        self._gauges.append((f'{name}_total', help_text, fn, 'counter'))
+
+    def render(self):
+        p = self.prefix
+        with self._lock:
+            hists = {k: (list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        out = [f'# HELP {p}_stage_seconds Time spent per request in each stage.',
+               f'# TYPE {p}_stage_seconds histogram']
+        for (endpoint, stage), (counts, total, count) in sorted(hists.items()):
+            labels = f'endpoint="{endpoint}",stage="{stage}"'
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                out.append(f'{p}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            out.append(f'{p}_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            out.append(f'{p}_stage_seconds_sum{{{labels}}} {total:.6f}')
+            out.append(f'{p}_stage_seconds_count{{{labels}}} {count}')
+
+        out += [f'# HELP {p}_requests_total Requests by endpoint and status code.',
+                f'# TYPE {p}_requests_total counter']
+        for (endpoint, status), n in sorted(counters.items()):
+            out.append(f'{p}_requests_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+
+        for name, help_text, fn, kind in self._gauges:
+            out += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} {kind}']
+            values = fn()
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labels, value in values.items():
+                label_str = ','.join(f'{k}="{v}"' for k, v in labels)
+                out.append(f'{p}_{name}{{{label_str}}} {value}' if label_str else f'{p}_{name} {value}')
+        return '\n'.join(out) + '\n'
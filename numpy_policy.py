@@ -0,0 +1,70 @@
+import numpy as np
+
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0),
+    'identity': lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """
+    Torch-free copy of a PPO actor exported by export_policy.py.
+
+    Runs the MLP with NumPy and takes the per-dimension argmax of the MultiDiscrete
+    logits, matching PPO.predict(obs, deterministic=True) for single (13,) or
+    batched (k, 13) observations.
+    """
+
+    def __init__(self, weights, biases, activations, action_dims, seed=None):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activation_names = [str(a) for a in activations]
+        self.activations = [ACTIVATIONS[a] for a in self.activation_names]
+        self.action_dims = [int(d) for d in action_dims]
+        self.splits = np.cumsum(self.action_dims)[:-1]
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def load(cls, path, seed=None):
+        with np.load(path) as z:
+            n = int(z['n_layers'])
+            weights = [z[f'w{i}'] for i in range(n)]
+            biases = [z[f'b{i}'] for i in range(n)]
+            activations = [str(a) for a in z['activations']]
+            action_dims = z['action_dims']
+        return cls(weights, biases, activations, action_dims, seed=seed)
+
+    def save(self, path):
+        arrays = {f'w{i}': w for i, w in enumerate(self.weights)}
+        arrays.update({f'b{i}': b for i, b in enumerate(self.biases)})
+        np.savez(
+            path,
+            n_layers=len(self.weights),
+            activations=np.array(self.activation_names, dtype=str),
+            action_dims=np.array(self.action_dims, dtype=np.int64),
+            **arrays
+        )
+
+    def logits(self, obs):
+        h = np.asarray(obs, dtype=np.float32)
+        for w, b, act in zip(self.weights, self.biases, self.activations):
+            h = act(h @ w + b)
+        return h
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.ndim == 1
+        logits = self.logits(obs.reshape(1, -1) if single else obs)
+
+        actions = []
+        for part in np.split(logits, self.splits, axis=1):
+            if deterministic:
+                actions.append(part.argmax(axis=1))
+            else:
+                p = np.exp(part - part.max(axis=1, keepdims=True))
+                p /= p.sum(axis=1, keepdims=True)
+                u = self.rng.random((len(p), 1))
+                actions.append(np.minimum((u > np.cumsum(p, axis=1)).sum(axis=1), p.shape[1] - 1))
+        actions = np.stack(actions, axis=1)
+        return (actions[0] if single else actions), state
@@ -0,0 +1,218 @@
+import argparse
+from contextlib import nullcontext
+
+import numpy as np
+
+from tables import load_tables
+from batch_simulator import BatchSimulator, MAX_BALLS, MAX_WICKETS
+
+N_OVERS = MAX_BALLS // 6
+QUOTA = 4
+N_BOWLERS = 10  # CricketEnv action space: bowler_0 .. bowler_9
+
+
+def phase_of_over(over):
+    over = np.asarray(over)
+    return np.where(over < 6, 0, np.where(over < 16, 1, 2))
+
+
+def ball_rewards(tables, n_bowlers=N_BOWLERS):
+    """
+    Expected one-ball reward (CricketEnv._compute_reward: -runs + 6*wicket + dot) and
+    wicket probability for every (phase, slot, intent) of the first n_bowlers slots,
+    applying the simulator's intent adjustments to the table's run distribution exactly.
+    """
+    rows = tables.slot_to_id(np.arange(n_bowlers))
+    cdf = tables.cdf[:, rows]
+    p = np.diff(cdf, axis=2, prepend=0.0).clip(min=0)
+    p[..., 6] += 1.0 - p.sum(axis=2)
+    w = tables.wicket_prob[:, rows]
+
+    # aggressive: 15% of balls get +0/1/2 runs (capped at 6), plus an extra 3% wicket chance
+    bumped = np.zeros_like(p)
+    for extra in range(3):
+        bumped[..., extra:] += p[..., :7 - extra] / 3
+        bumped[..., 6] += p[..., 7 - extra:].sum(axis=2) / 3
+    aggressive = 0.85 * p + 0.15 * bumped
+
+    # defensive: 60% of balls lose a run (floored at 0)
+    trimmed = np.zeros_like(p)
+    trimmed[..., :6] = p[..., 1:]
+    trimmed[..., 0] += p[..., 0]
+    defensive = 0.4 * p + 0.6 * trimmed
+
+    runs_p = np.stack([defensive, p, aggressive], axis=2)
+    wicket_p = np.stack([w, w, 1 - (1 - w) * 0.97], axis=2)
+    reward = -(runs_p * np.arange(7)).sum(axis=3) + 6 * wicket_p + runs_p[..., 0]
+    return reward, wicket_p
+
+
+def allocate_overs(over_values, phase_overs, quota=QUOTA):
+    """
+    Quota-optimal allocation: over_values[phase, slot] is the expected reward of one over,
+    phase_overs the number of overs in each phase. Returns alloc[slot, phase] maximising
+    the summed per-over values with at most `quota` overs per slot, via a DP over slots
+    whose state is the overs still to be assigned in each phase. The values treat every
+    over as bowled, i.e. the innings ending early at 10 wickets is not modelled here.
+    """
+    n_phases, n_slots = over_values.shape
+    if n_slots * quota < sum(phase_overs):
+        raise ValueError(f"{n_slots} bowlers with a {quota}-over quota cannot bowl {sum(phase_overs)} overs")
+
+    choices = [c for c in np.ndindex(*(min(quota, n) + 1 for n in phase_overs)) if sum(c) <= quota]
+    shape = tuple(n + 1 for n in phase_overs)
+    best = np.full(shape, -np.inf)
+    best[(0,) * n_phases] = 0.0
+    picks = []
+
+    for s in reversed(range(n_slots)):
+        value = np.full(shape, -np.inf)
+        pick = np.zeros(shape + (n_phases,), dtype=np.int64)
+        for c in choices:
+            gain = float(np.dot(c, over_values[:, s]))
+            src = tuple(slice(0, n + 1 - k) for n, k in zip(phase_overs, c))
+            dst = tuple(slice(k, n + 1) for n, k in zip(phase_overs, c))
+            cand = best[src] + gain
+            better = cand > value[dst]
+            value[dst] = np.where(better, cand, value[dst])
+            pick[dst][better] = c
+        best = value
+        picks.append(pick)
+
+    alloc = np.zeros((n_slots, n_phases), dtype=np.int64)
+    remaining = tuple(phase_overs)
+    for s, pick in enumerate(reversed(picks)):
+        alloc[s] = pick[remaining]
+        remaining = tuple(r - a for r, a in zip(remaining, alloc[s]))
+    return alloc
+
+
+def order_overs(alloc, phases):
+    """Bowler per over from an allocation, never giving one bowler consecutive overs when avoidable."""
+    left = alloc.copy()
+    plan, prev = [], -1
+    for over, phase in enumerate(phases):
+        options = np.flatnonzero(left[:, phase] > 0)
+        ranked = sorted(options, key=lambda s: (s == prev, -left[s].sum()))
+        prev = int(ranked[0])
+        left[prev, phase] -= 1
+        plan.append(prev)
+    return np.array(plan, dtype=np.int64)
+
+
+class DPPolicy:
+    """
+    Precomputed bowling plan: actions[balls_bowled, wickets] = (bowler slot, intent).
+
+    predict() takes observations laid out like CricketEnv._get_obs and is a pure array
+    lookup, so it can stand in for the PPO model in projections and serving.
+    """
+
+    def __init__(self, actions, value=None, bowler_plan=None):
+        self.actions = np.asarray(actions, dtype=np.int64)
+        self.value = value
+        self.bowler_plan = bowler_plan if bowler_plan is not None else self.actions[::6, 0, 0]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z['actions'], z['value'], z['bowler_plan'])
+
+    def save(self, path):
+        np.savez(path, actions=self.actions, value=self.value, bowler_plan=self.bowler_plan)
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(obs)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, obs.shape[-1])
+        balls = np.clip(obs[:, 0].astype(np.int64) * 6 + obs[:, 1].astype(np.int64), 0, MAX_BALLS - 1)
+        wickets = np.clip(obs[:, 3].astype(np.int64), 0, MAX_WICKETS)
+        actions = self.actions[balls, wickets]
+        return (actions[0] if single else actions), state
+
+    def session(self):
+        """Same interface as BatchedPredictor.session(); lookups need no batching."""
+        return nullcontext(self)
+
+
+def solve(tables, quota=QUOTA, n_bowlers=N_BOWLERS):
+    """
+    Bowling plan for CricketEnv reward under one bowler per over and a `quota`-over
+    limit per bowler: a quota-optimal allocation, with intents by backward induction.
+
+    The allocation maximises the sum of per-over expected rewards, ignoring that the
+    innings may end at 10 wickets, and order_overs then sequences it greedily. Intents
+    are chosen by backward induction over (ball, wickets) with that plan fixed, so only
+    they account for the innings ending early. The result is a heuristic, not the
+    optimum of the full (ball, wickets, overs left per bowler) problem.
+    """
+    reward, wicket_p = ball_rewards(tables, n_bowlers)
+    phases = phase_of_over(np.arange(N_OVERS))
+    phase_overs = np.bincount(phases, minlength=reward.shape[0])
+
+    alloc = allocate_overs(6 * reward.max(axis=2), phase_overs, quota)
+    plan = order_overs(alloc, phases)
+
+    value = np.zeros((MAX_BALLS + 1, MAX_WICKETS + 1))
+    actions = np.zeros((MAX_BALLS, MAX_WICKETS + 1, 2), dtype=np.int64)
+    actions[:, :, 1] = 1
+    for b in reversed(range(MAX_BALLS)):
+        s = plan[b // 6]
+        r, w = reward[phases[b // 6], s], wicket_p[phases[b // 6], s]
+        q = r[None, :] + w[None, :] * value[b + 1, 1:, None] + (1 - w[None, :]) * value[b + 1, :-1, None]
+        actions[b, :, 0] = s
+        actions[b, :-1, 1] = q.argmax(axis=1)
+        value[b, :-1] = q.max(axis=1)
+    return DPPolicy(actions, value, plan)
+
+
+def evaluate(tables, predict_policy, n_innings=20000, seed=0):
+    """Play n_innings with BatchSimulator under an SB3-style policy and summarise runs and reward."""
+    sim = BatchSimulator(tables, n_innings, seed=seed)
+    last5 = np.zeros((n_innings, 5), dtype=np.float32)
+    reward = np.zeros(n_innings)
+    overs_by_slot = np.zeros((n_innings, sim.n_bowlers), dtype=np.int64)
+    while not sim.done.all():
+        live = ~sim.done
+        actions, _ = predict_policy.predict(sim.observations(last5), deterministic=True)
+        actions = np.asarray(actions).reshape(n_innings, -1)
+        start_of_over = live & (sim.ball == 0)
+        overs_by_slot[start_of_over, np.minimum(actions[start_of_over, 0], sim.n_bowlers - 1)] += 1
+        out = sim.step(actions[:, 0], actions[:, 1])
+        runs, wicket = out['runs'], out['wicket']
+        reward[live] += (-runs + 6 * wicket + (runs == 0))[live]
+        last5[live, :-1] = last5[live, 1:]
+        last5[live, -1] = runs[live]
+    return {
+        'runs_conceded': float(sim.score.mean()),
+        'runs_std': float(sim.score.std()),
+        'wickets': float(sim.wickets.mean()),
+        'reward': float(reward.mean()),
+        'quota_breaches': float((overs_by_slot > QUOTA).any(axis=1).mean()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--out', default='models/dp_policy.npz')
+    parser.add_argument('--quota', type=int, default=QUOTA)
+    parser.add_argument('--compare', type=int, default=0, help='innings per policy for a comparison with PPO')
+    parser.add_argument('--policy', default='models/ppo_cricket_policy.npz')
+    args = parser.parse_args()
+
+    tables = load_tables(args.empirical, args.mappings)
+    policy = solve(tables, args.quota)
+    policy.save(args.out)
+    print(f"Bowler per over: {policy.bowler_plan.tolist()}")
+    print(f"Expected reward per innings: {policy.value[0, 0]:.2f}")
+    print(f"Saved DP policy → {args.out}")
+
+    if args.compare:
+        from numpy_policy import NumpyPolicy
+        print(f"{'policy':8s} {'runs':>8s} {'std':>6s} {'wkts':>6s} {'reward':>8s} {'quota breaches':>15s}")
+        for name, p in [('dp', policy), ('ppo', NumpyPolicy.load(args.policy))]:
+            r = evaluate(tables, p, args.compare)
+            print(f"{name:8s} {r['runs_conceded']:8.1f} {r['runs_std']:6.1f} {r['wickets']:6.2f} "
+                  f"{r['reward']:8.1f} {r['quota_breaches']:15.1%}")
@@ -0,0 +1,195 @@
+import argparse
+import threading
+
+import numpy as np
+
+from tables import load_tables
+from batch_simulator import BatchSimulator
+from numpy_policy import NumpyPolicy
+
+SCORE_BUCKET = 1
+MAX_SCORE_BUCKET = 511
+
+# observation column, bit offset and largest value of each key field
+KEY_COLUMNS = np.array([0, 1, 3, 2, 8, 9, 10, 11, 12])
+KEY_SHIFTS = np.array([0, 5, 8, 12, 21, 24, 27, 30, 33], dtype=np.int64)
+KEY_LIMITS = np.array([31, 7, 15, MAX_SCORE_BUCKET, 7, 7, 7, 7, 7], dtype=np.int64)
+
+
+def pack_keys(obs, score_bucket=SCORE_BUCKET):
+    """
+    One int64 per observation laid out like CricketEnv._get_obs:
+    over (5 bits) | ball (3) | wickets (4) | score // score_bucket (9) | last5 runs (3 each).
+    balls_left and the phase one-hot follow from over and ball, so they are not stored.
+    """
+    fields = np.asarray(obs).reshape(-1, 13)[:, KEY_COLUMNS].astype(np.int64)
+    if score_bucket != 1:
+        fields[:, 3] //= score_bucket
+    fields = np.minimum(np.maximum(fields, 0), KEY_LIMITS)
+    return (fields << KEY_SHIFTS).sum(axis=1)
+
+
+class TablePolicy:
+    """
+    Policy actions precomputed per discretized observation (see pack_keys).
+
+    keys are sorted, so predict() is one searchsorted over the batch; observations
+    whose cell is not in the table go to `fallback` (an SB3-style model) in one call.
+    """
+
+    def __init__(self, keys, actions, score_bucket=SCORE_BUCKET, fallback=None):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.actions = np.asarray(actions, dtype=np.int8)
+        self.score_bucket = int(score_bucket)
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path, fallback=None):
+        with np.load(path) as z:
+            return cls(z['keys'], z['actions'], int(z['score_bucket']), fallback=fallback)
+
+    def save(self, path):
+        np.savez(path, keys=self.keys, actions=self.actions, score_bucket=self.score_bucket)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.actions.nbytes
+
+    def lookup(self, obs):
+        """(actions, hit mask); rows without a table entry are left as (0, 1)."""
+        keys = pack_keys(obs, self.score_bucket)
+        if len(self.keys) == 0:
+            return np.tile(np.array([0, 1], dtype=np.int64), (len(keys), 1)), np.zeros(len(keys), dtype=bool)
+        # sorted needles walk the table in order, which is ~3x faster than random probes
+        order = np.argsort(keys)
+        idx = np.empty_like(order)
+        idx[order] = np.searchsorted(self.keys, keys[order])
+        idx = np.minimum(idx, len(self.keys) - 1)
+        hit = self.keys[idx] == keys
+        actions = self.actions[idx].astype(np.int64)
+        actions[~hit] = (0, 1)
+        return actions, hit
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, 13)
+        actions, hit = self.lookup(obs)
+        miss = ~hit
+        if miss.any() and self.fallback is not None:
+            fb, _ = self.fallback.predict(obs[miss], deterministic=True)
+            actions[miss] = np.asarray(fb).reshape(int(miss.sum()), -1)
+        with self._lock:
+            self.hits += int(hit.sum())
+            self.misses += int(miss.sum())
+        return (actions[0] if single else actions), state
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entries': len(self.keys), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0}
+
+
+def _rollout_pairs(tables, model, n_innings, epsilon, rng, score_bucket=SCORE_BUCKET):
+    """(keys, model actions) for every ball of n_innings, exploring with probability epsilon."""
+    sim = BatchSimulator(tables, n_innings, seed=rng)
+    last5 = np.zeros((n_innings, 5), dtype=np.float32)
+    keys, actions = [], []
+    while not sim.done.all():
+        rows = np.flatnonzero(~sim.done)
+        obs = sim.observations(last5)[rows]
+        act, _ = model.predict(obs, deterministic=True)
+        act = np.asarray(act).reshape(len(rows), -1)
+        keys.append(pack_keys(obs, score_bucket))
+        actions.append(act)
+
+        played = act.copy()
+        explore = rng.random(len(rows)) < epsilon
+        played[explore, 0] = rng.integers(0, 10, int(explore.sum()))
+        played[explore, 1] = rng.integers(0, 3, int(explore.sum()))
+        bowler = np.zeros(sim.n, dtype=np.int64)
+        intent = np.ones(sim.n, dtype=np.int64)
+        bowler[rows], intent[rows] = played[:, 0], played[:, 1]
+        runs = sim.step(bowler, intent)['runs']
+        last5[rows, :-1] = last5[rows, 1:]
+        last5[rows, -1] = runs[rows]
+    return np.concatenate(keys), np.concatenate(actions)
+
+
+def build_table(tables, model, n_innings=50000, epsilon=0.1, seed=0, chunk_size=2000,
+                score_bucket=SCORE_BUCKET, min_purity=1.0):
+    """
+    Sample reachable observations by playing innings with the model (plus epsilon-random
+    actions to widen coverage) and keep, per cell, the model action seen most often.
+    Cells where that action covers less than `min_purity` of the samples (the model's
+    choice depends on what the cell discretizes away) are dropped and left to the fallback.
+    """
+    rng = np.random.default_rng(seed)
+    cells = []
+    done = 0
+    while done < n_innings:
+        n = min(chunk_size, n_innings - done)
+        keys, actions = _rollout_pairs(tables, model, n, epsilon, rng, score_bucket)
+        cell, counts = np.unique(keys * 32 + actions[:, 0] * 3 + actions[:, 1], return_counts=True)
+        cells.append((cell, counts))
+        done += n
+
+    cell = np.concatenate([c for c, _ in cells])
+    counts = np.concatenate([n for _, n in cells])
+    cell, inverse = np.unique(cell, return_inverse=True)
+    counts = np.bincount(inverse, weights=counts)
+
+    keys, code = cell // 32, cell % 32
+    # cells are sorted by key then action code; pick the most frequent action per key
+    order = np.lexsort((-counts, keys))
+    keys, code, counts = keys[order], code[order], counts[order]
+    first = np.r_[True, keys[1:] != keys[:-1]]
+    totals = np.add.reduceat(counts, np.flatnonzero(first))
+    keep = counts[first] >= min_purity * totals
+    actions = np.stack([code[first] // 3, code[first] % 3], axis=1)
+    return TablePolicy(keys[first][keep], actions[keep], score_bucket)
+
+
+def evaluate_table(tables, table, model, n_innings=2000, seed=1):
+    """Coverage and agreement with the live model on fresh on-policy innings."""
+    keys, expected = _rollout_pairs(tables, model, n_innings, 0.0, np.random.default_rng(seed), table.score_bucket)
+    idx = np.minimum(np.searchsorted(table.keys, keys), len(table.keys) - 1)
+    hit = table.keys[idx] == keys
+    agree = (table.actions[idx[hit]] == expected[hit]).all(axis=1)
+    return {
+        'observations': int(len(keys)),
+        'coverage': float(hit.mean()),
+        'agreement_covered': float(agree.mean()) if len(agree) else 0.0,
+        'agreement_with_fallback': float((agree.sum() + (~hit).sum()) / len(keys)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--policy', default='models/ppo_cricket_policy.npz')
+    parser.add_argument('--out', default='models/ppo_policy_table.npz')
+    parser.add_argument('--innings', type=int, default=50000, help='innings sampled to find reachable cells')
+    parser.add_argument('--epsilon', type=float, default=0.1, help='share of random actions while sampling')
+    parser.add_argument('--score-bucket', type=int, default=SCORE_BUCKET)
+    parser.add_argument('--min-purity', type=float, default=1.0,
+                        help='drop cells where the majority action covers less than this share of samples')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tables = load_tables(args.empirical, args.mappings)
+    model = NumpyPolicy.load(args.policy)
+    table = build_table(tables, model, n_innings=args.innings, epsilon=args.epsilon, seed=args.seed,
+                        score_bucket=args.score_bucket, min_purity=args.min_purity)
+    table.save(args.out)
+    print(f"Saved policy table → {args.out}: {len(table.keys):,} cells, {table.nbytes / 1e6:.1f} MB")
+
+    report = evaluate_table(tables, table, model, seed=args.seed + 1)
+    print(f"Held-out innings: {report['observations']:,} observations, coverage {report['coverage']:.1%}, "
+          f"agreement {report['agreement_covered']:.1%} on covered cells, "
+          f"{report['agreement_with_fallback']:.1%} with model fallback")
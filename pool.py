@@ -0,0 +1,43 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class PoolBusy(Exception):
+    pass
+
+
+class SimulatorPool:
+    """
+    Fixed set of pre-built (simulator, env) pairs handed out one per request.
+
+    At most `size` requests simulate at once; up to `max_waiting` more queue for a
+    free slot for `timeout` seconds. Beyond that, acquire() raises PoolBusy.
+    """
+
+    def __init__(self, factory, size=4, max_waiting=16, timeout=30.0):
+        self.size = size
+        self.timeout = timeout
+        self._free = queue.Queue()
+        for _ in range(size):
+            self._free.put(factory())
+        self._admission = threading.BoundedSemaphore(size + max_waiting)
+
+    @contextmanager
+    def acquire(self):
+        if not self._admission.acquire(blocking=False):
+            raise PoolBusy("simulation queue is full")
+        try:
+            try:
+                item = self._free.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolBusy("timed out waiting for a free simulator")
+            try:
+                yield item
+            finally:
+                self._free.put(item)
+        finally:
+            self._admission.release()
+
+    def in_use(self):
+        return self.size - self._free.qsize()
@@ -0,0 +1,225 @@
+import time
+import numpy as np
+
+from batch_simulator import MAX_BALLS, MAX_WICKETS, BatchSimulator
+
+QUANTILES = [5, 10, 25, 50, 75, 90, 95]
+N_BOWLERS = 10  # CricketEnv action space: bowler_0 .. bowler_9
+N_INTENTS = 3
+MIN_CHUNK = 100  # smallest chunk worth starting under a time budget
+
+
+def parse_overs(overs):
+    """Balls bowled from overs notation, e.g. "11.2" is 11 overs and 2 balls."""
+    whole, _, part = str(overs).partition('.')
+    balls = int(part or 0)
+    if not 0 <= balls <= 5:
+        raise ValueError(f"overs {overs!r}: the ball part must be 0..5")
+    return int(whole) * 6 + balls
+
+
+def check_state(score, wickets, balls_bowled):
+    if score < 0:
+        raise ValueError(f"score must be non-negative, got {score}")
+    if not 0 <= wickets <= MAX_WICKETS:
+        raise ValueError(f"wickets must be 0..{MAX_WICKETS}, got {wickets}")
+    if not 0 <= balls_bowled < MAX_BALLS:
+        raise ValueError(f"balls bowled must be 0..{MAX_BALLS - 1}, got {balls_bowled}")
+
+
+def parse_last5(last5):
+    """Runs off the last five balls (oldest first) as a float32 (5,) array; shorter lists are left-padded with 0."""
+    if last5 is None:
+        return np.zeros(5, dtype=np.float32)
+    if not isinstance(last5, list) or len(last5) > 5:
+        raise ValueError("last5 must be a list of at most 5 run counts")
+    runs = [int(r) for r in last5]
+    if any(not 0 <= r <= 6 for r in runs):
+        raise ValueError(f"last5 runs must be 0..6, got {last5}")
+    return np.pad(np.asarray(runs, dtype=np.float32), (5 - len(runs), 0))
+
+
+def parse_plan(plan):
+    """A bowling plan as a non-empty list of bowler slots 0..N_BOWLERS-1, one per over."""
+    if not isinstance(plan, list) or not plan:
+        raise ValueError("a bowling plan must be a non-empty list of bowler slots")
+    plan = [int(b) for b in plan]
+    bad = [b for b in plan if not 0 <= b < N_BOWLERS]
+    if bad:
+        raise ValueError(f"bowler slots must be 0..{N_BOWLERS - 1}, got {bad[0]}")
+    return plan
+
+
+def model_policy(model):
+    """Bowling plan from a policy with an SB3-style predict(), queried once per ball for all live innings."""
+    def _policy(sim, last5):
+        bowler = np.zeros(sim.n, dtype=np.int64)
+        intent = np.ones(sim.n, dtype=np.int64)
+        rows = np.flatnonzero(~sim.done)
+        actions, _ = model.predict(sim.observations(last5)[rows], deterministic=True)
+        actions = np.asarray(actions).reshape(len(rows), -1)
+        bowler[rows] = actions[:, 0]
+        if actions.shape[1] > 1:
+            intent[rows] = actions[:, 1]
+        return bowler, intent
+    return _policy
+
+
+def plan_policy(plan, intent=1):
+    """Fixed plan: plan[over] is the bowler slot for that over (the last entry repeats)."""
+    plan = np.asarray(parse_plan(list(plan)), dtype=np.int64)
+    if not 0 <= intent < N_INTENTS:
+        raise ValueError(f"intent must be 0..{N_INTENTS - 1}, got {intent}")
+
+    def _policy(sim, last5):
+        return plan[np.minimum(sim.over, len(plan) - 1)], np.full(sim.n, intent, dtype=np.int64)
+    return _policy
+
+
+def random_policy(sim, last5):
+    """Uniformly random bowler slot with normal intent."""
+    return sim.rng.integers(0, sim.n_bowlers, sim.n), np.ones(sim.n, dtype=np.int64)
+
+
+def rollout(tables, policy, n, state, recent, seed, matchups=None, batting_order=None):
+    """Play n innings from `state`: final scores, wickets and runs per batting position (n, 12)."""
+    sim = BatchSimulator(tables, n, seed=seed, matchups=matchups, batting_order=batting_order)
+    sim.set_state(**state)
+    last5 = np.tile(recent, (n, 1))
+
+    while not sim.done.all():
+        live = ~sim.done
+        bowler, intent = policy(sim, last5)
+        outcome = sim.step(bowler, intent)
+        last5[live, :-1] = last5[live, 1:]
+        last5[live, -1] = outcome['runs'][live]
+    return sim.score, sim.wickets, sim.batsman_scores
+
+
+def batting_order(striker, non_striker, rest=()):
+    """Order for a projection: the two batters at the crease, then `rest` as wickets fall."""
+    at_crease = [str(striker), str(non_striker)]
+    return at_crease + [str(b) for b in rest if str(b) not in at_crease]
+
+
+def project_innings(tables, policy, n_rollouts=10000, score=0, wickets=0, balls_bowled=0,
+                    last5=None, target=None, seed=None, bin_width=10, budget_ms=None, chunk_size=2500,
+                    matchups=None, batting_order=None):
+    """
+    Play up to n_rollouts innings from the given state under `policy` and summarise the
+    distribution of final totals and wickets. The striker and non-striker are batting
+    order positions 0 and 1; later positions come in as wickets fall. With matchups,
+    `batting_order` names those positions (default: the tables' batsman_list).
+
+    Rollouts run in chunks of chunk_size. With budget_ms set, the first chunk is small
+    (MIN_CHUNK) and each later one is sized from the measured rate to fit the time left,
+    so the summary covers as many rollouts as the budget allows. Chunk seeds are spawned
+    in order from `seed`, so without a budget the result depends only on the seed.
+    """
+    if n_rollouts < 1:
+        raise ValueError(f"n_rollouts must be at least 1, got {n_rollouts}")
+    check_state(score, wickets, balls_bowled)
+    t0 = time.perf_counter()
+    state = {'score': score, 'wickets': wickets, 'balls_bowled': balls_bowled}
+    recent = parse_last5(last5)
+    seeds = np.random.SeedSequence(seed)
+
+    scores, wkts, bats = [], [], []
+    done = 0
+    while done < n_rollouts:
+        n = min(chunk_size, n_rollouts - done)
+        if budget_ms is not None:
+            if not done:
+                n = min(n, MIN_CHUNK)
+            else:
+                elapsed = (time.perf_counter() - t0) * 1000
+                n = min(n, int((budget_ms - elapsed) * done / elapsed))
+                if n < MIN_CHUNK:
+                    break
+        (chunk_seed,) = seeds.spawn(1)
+        s, w, b = rollout(tables, policy, n, state, recent, np.random.default_rng(chunk_seed), matchups,
+                          batting_order)
+        scores.append(s)
+        wkts.append(w)
+        bats.append(b[:, :2])
+        done += n
+
+    final = np.concatenate(scores)
+    batsmen = np.concatenate(bats)
+    result = summarise_rollouts(final, np.concatenate(wkts), target, bin_width)
+    result['batsmen_additional_runs'] = {
+        'striker': float(batsmen[:, 0].mean()),
+        'non_striker': float(batsmen[:, 1].mean()),
+    }
+    result['elapsed_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+def summarise_rollouts(final, wickets_out, target=None, bin_width=10):
+    """Distribution summary of final totals and wickets over a set of rollouts."""
+    lo = int(final.min()) // bin_width * bin_width
+    edges = np.arange(lo, int(final.max()) + bin_width + 1, bin_width)
+    counts, edges = np.histogram(final, bins=edges)
+
+    result = {
+        'n_rollouts': int(len(final)),
+        'final_score': {
+            'mean': float(final.mean()),
+            'std': float(final.std()),
+            'quantiles': {f"p{q}": float(v) for q, v in zip(QUANTILES, np.percentile(final, QUANTILES))},
+        },
+        'histogram': {'bin_edges': [int(e) for e in edges], 'counts': [int(c) for c in counts]},
+        'wickets': {
+            'mean': float(wickets_out.mean()),
+            'p_all_out': float((wickets_out >= 10).mean()),
+            'distribution': [int(c) for c in np.bincount(wickets_out, minlength=11)],
+        },
+    }
+    if target is not None:
+        result['target'] = {'runs': int(target), 'p_reach': float((final >= target).mean())}
+    return result
+
+
+def _percentiles_from_counts(counts, qs):
+    """np.percentile (linear) of the values behind counts[value] = occurrences, without expanding them."""
+    cum = np.cumsum(counts)
+    pos = (cum[-1] - 1) * np.asarray(qs, dtype=np.float64) / 100
+    lo, hi = np.floor(pos).astype(np.int64), np.ceil(pos).astype(np.int64)
+    v_lo, v_hi = np.searchsorted(cum, lo, side='right'), np.searchsorted(cum, hi, side='right')
+    return v_lo + (pos - lo) * (v_hi - v_lo)
+
+
+def summarise_counts(score_counts, wicket_counts, target=None, bin_width=10):
+    """
+    summarise_rollouts() from mergeable counts: score_counts[total] and wicket_counts[wickets]
+    over all rollouts. Gives the same numbers as summarising the raw arrays.
+    """
+    score_counts = np.asarray(score_counts, dtype=np.int64)
+    wicket_counts = np.asarray(wicket_counts, dtype=np.int64)
+    n = int(score_counts.sum())
+    values = np.arange(len(score_counts))
+    nonzero = np.flatnonzero(score_counts)
+    lo = int(nonzero[0]) // bin_width * bin_width
+    edges = np.arange(lo, int(nonzero[-1]) + bin_width + 1, bin_width)
+    padded = np.pad(score_counts, (0, max(0, int(edges[-1]) - len(score_counts))))
+    counts = np.add.reduceat(padded[lo:int(edges[-1])], edges[:-1] - lo)
+    mean = float((values * score_counts).sum() / n)
+    wickets = np.pad(wicket_counts, (0, max(0, 11 - len(wicket_counts))))
+
+    result = {
+        'n_rollouts': n,
+        'final_score': {
+            'mean': mean,
+            'std': float(np.sqrt((score_counts * (values - mean) ** 2).sum() / n)),
+            'quantiles': {f"p{q}": float(v) for q, v in zip(QUANTILES, _percentiles_from_counts(score_counts, QUANTILES))},
+        },
+        'histogram': {'bin_edges': [int(e) for e in edges], 'counts': [int(c) for c in counts]},
+        'wickets': {
+            'mean': float((np.arange(len(wickets)) * wickets).sum() / n),
+            'p_all_out': float(wickets[10:].sum() / n),
+            'distribution': [int(c) for c in wickets],
+        },
+    }
+    if target is not None:
+        result['target'] = {'runs': int(target), 'p_reach': float(score_counts[int(target):].sum() / n)}
+    return result
@@ -0,0 +1,74 @@
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:  # optional: without it every client gets JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional: without it gzip is the only compression
+    brotli = None
+
+INTENTS = ['defensive', 'normal', 'aggressive']
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def columnar_innings(result):
+    """
+    Column-per-field form of a /simulate_ajax result: bowler and batsman names are
+    stored once in `names` and referenced by index, the running score and wickets per
+    ball replace both the preformatted "score" strings and the duplicate chart arrays,
+    and ball numbers are implicit (1..n).
+    """
+    lines = [l for l in result['lines'] if 'ball' in l]
+    bowlers, batsmen = {}, {}
+    cols = {'bowler_slot': [], 'bowler': [], 'batsman': [], 'intent': [], 'runs': [], 'wicket': []}
+    for l in lines:
+        cols['bowler_slot'].append(int(l['bowler_id'].rsplit('_', 1)[1]))
+        cols['bowler'].append(bowlers.setdefault(l['bowler_name'], len(bowlers)))
+        cols['batsman'].append(batsmen.setdefault(l['batsman'], len(batsmen)))
+        cols['intent'].append(INTENTS.index(l['intent']))
+        cols['runs'].append(l['runs'])
+        cols['wicket'].append(int(l['wicket']))
+    cols['score'] = list(result['chart']['scores'])
+    cols['wickets'] = list(result['chart']['wickets'])
+    out = {
+        'format': 'columnar',
+        'final_score': result['final_score'],
+        'bowler_usage': result['bowler_usage'],
+        'names': {'bowler': list(bowlers), 'batsman': list(batsmen), 'intent': INTENTS},
+        'balls': cols,
+    }
+    notes = [l['note'] for l in result['lines'] if 'note' in l]
+    if notes:
+        out['notes'] = notes
+    return out
+
+
+def negotiate(accept_mimetypes, accept_encodings):
+    """(media type, content encoding or None) for a request's Accept / Accept-Encoding headers."""
+    offered = ['application/json'] + (list(MSGPACK_TYPES) if msgpack is not None else [])
+    mimetype = accept_mimetypes.best_match(offered, default='application/json')
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+    encoding = accept_encodings.best_match(encodings)
+    return mimetype, encoding
+
+
+def encode(payload, mimetype='application/json', encoding=None):
+    """Serialized (and, above MIN_COMPRESS_BYTES, compressed) body; returns (bytes, headers)."""
+    if mimetype in MSGPACK_TYPES:
+        body = msgpack.packb(payload, use_bin_type=True)
+    else:
+        mimetype = 'application/json'
+        body = json.dumps(payload, separators=(',', ':')).encode()
+    headers = {'Content-Type': mimetype, 'Vary': 'Accept, Accept-Encoding'}
+    if encoding and len(body) >= MIN_COMPRESS_BYTES:
+        body = brotli.compress(body, quality=BROTLI_QUALITY) if encoding == 'br' else \
+            gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers['Content-Encoding'] = encoding
+    return body, headers
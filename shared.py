@@ -0,0 +1,206 @@
+import os
+import json
+import mmap
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+ALIGN = 64
+MAGIC = b'CRKSTATE'
+FORMAT_VERSION = 1
+
+
+def layout(arrays):
+    """Byte offset, shape and dtype of each array when packed back to back, ALIGN-aligned; plus total size."""
+    spec, offset = {}, 0
+    for name, a in arrays.items():
+        a = np.asarray(a)
+        spec[name] = (offset, a.shape, a.dtype.str)
+        offset += -(-a.nbytes // ALIGN) * ALIGN
+    return spec, offset
+
+
+def views(buf, spec):
+    """Read-only arrays over buf laid out as in `spec` (no copies)."""
+    out = {}
+    for name, (offset, shape, dtype) in spec.items():
+        a = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buf, offset=offset)
+        a.flags.writeable = False
+        out[name] = a
+    return out
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays copied once into a single shared-memory block.
+
+    The creating process passes `spec` (block name and layout, a few hundred bytes) to
+    workers, which attach() and get read-only views of the same pages instead of
+    loading their own copies. Only the creator unlinks the block.
+    """
+
+    def __init__(self, shm, spec, owner):
+        self.shm = shm
+        self.spec = spec
+        self.owner = owner
+        self.arrays = views(shm.buf, spec[1])
+
+    @classmethod
+    def create(cls, arrays):
+        spec, size = layout(arrays)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, (offset, shape, dtype) in spec.items():
+            dst = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            dst[...] = arrays[name]
+        return cls(shm, (shm.name, spec), owner=True)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(shared_memory.SharedMemory(name=spec[0]), spec, owner=False)
+
+    @property
+    def nbytes(self):
+        return self.shm.size
+
+    def close(self):
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class Artifact:
+    """
+    Read-only memory map of a file written by write_artifact():
+
+        MAGIC | header length (uint64 LE) | JSON header | padding | arrays
+
+    The header holds the format version, the `version` of the sources the file was built
+    from, the array layout and the export_state() meta. Every process mapping the file
+    shares its pages through the page cache, and opening it parses only the header.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a shared state artifact")
+        (n,) = struct.unpack_from('<Q', self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._mm[start:start + n]))
+        if self.header['format'] != FORMAT_VERSION:
+            raise ValueError(f"{path}: format {self.header['format']}, expected {FORMAT_VERSION}")
+        self.arrays = views(memoryview(self._mm)[self.header['data_offset']:], self.header['layout'])
+
+    @property
+    def version(self):
+        return self.header['version']
+
+    @property
+    def meta(self):
+        return self.header['meta']
+
+    @property
+    def nbytes(self):
+        return len(self._mm)
+
+
+def write_artifact(path, arrays, meta, version):
+    """Write arrays and meta for Artifact; atomic, so workers never map a partial file."""
+    spec, _ = layout(arrays)
+    header = {'format': FORMAT_VERSION, 'version': version, 'layout': spec, 'meta': meta}
+    # data_offset depends on the header length, which includes data_offset itself
+    header['data_offset'] = 0
+    while True:
+        body = json.dumps(header).encode()
+        data_offset = -(-(len(MAGIC) + 8 + len(body)) // ALIGN) * ALIGN
+        if data_offset == header['data_offset']:
+            break
+        header['data_offset'] = data_offset
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<Q', len(body)) + body)
+            for name, (offset, _, dtype) in spec.items():
+                f.seek(header['data_offset'] + offset)
+                f.write(np.ascontiguousarray(arrays[name], dtype=np.dtype(dtype)).tobytes())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_artifact(path, version, build):
+    """
+    Map the artifact at path, first rebuilding it with build() -> (arrays, meta) when it is
+    missing, unreadable or was built from other sources than `version`. Raises OSError
+    when it has to be rebuilt but cannot be written (e.g. a read-only directory).
+    """
+    try:
+        art = Artifact(path)
+        if art.version == version:
+            return art
+    except (OSError, ValueError, KeyError):
+        pass
+    arrays, meta = build()
+    write_artifact(path, arrays, meta, version)
+    return Artifact(path)
+
+
+def export_state(tables, policy=None, matchups=None, policy_table=None):
+    """
+    Split the read-only simulation state into arrays (to share) and a small JSON-able
+    description (names, activations) that rebuilds it with import_state().
+    """
+    arrays = {'tables.cdf': tables.cdf, 'tables.wicket_prob': tables.wicket_prob}
+    meta = {'tables': {'bowler_names': tables.bowler_names, 'slot_names': tables.slot_names,
+                       'batsman_list': tables.batsman_list}}
+    if policy is not None:
+        for i, (w, b) in enumerate(zip(policy.weights, policy.biases)):
+            arrays[f'policy.w{i}'], arrays[f'policy.b{i}'] = w, b
+        meta['policy'] = {'n_layers': len(policy.weights), 'activations': policy.activation_names,
+                          'action_dims': policy.action_dims}
+    if matchups is not None:
+        for k in ('base_cdf', 'base_wicket', 'keys', 'matchup_cdf', 'matchup_wicket', 'cdf', 'wicket_prob'):
+            arrays[f'matchups.{k}'] = getattr(matchups, k)
+        meta['matchups'] = {'bowler_names': matchups.bowler_names, 'batter_names': matchups.batter_names}
+    if policy_table is not None:
+        arrays['policy_table.keys'] = policy_table.keys
+        arrays['policy_table.actions'] = policy_table.actions
+        meta['policy_table'] = {'score_bucket': policy_table.score_bucket}
+    return arrays, meta
+
+
+def import_state(arrays, meta):
+    """
+    {'tables', 'policy', 'matchups', 'policy_table'} backed by `arrays` as built by
+    export_state(); parts that were not exported are None.
+    """
+    from tables import CompiledTables
+    from numpy_policy import NumpyPolicy
+    from matchups import MatchupTables
+    from policy_table import TablePolicy
+
+    m = meta['tables']
+    state = {'tables': CompiledTables(arrays['tables.cdf'], arrays['tables.wicket_prob'], m['bowler_names'],
+                                      m['slot_names'], m['batsman_list']),
+             'policy': None, 'matchups': None, 'policy_table': None}
+    if 'policy' in meta:
+        m = meta['policy']
+        state['policy'] = NumpyPolicy([arrays[f'policy.w{i}'] for i in range(m['n_layers'])],
+                                      [arrays[f'policy.b{i}'] for i in range(m['n_layers'])],
+                                      m['activations'], m['action_dims'])
+    if 'matchups' in meta:
+        m = meta['matchups']
+        state['matchups'] = MatchupTables(
+            arrays['matchups.base_cdf'], arrays['matchups.base_wicket'], arrays['matchups.keys'],
+            arrays['matchups.matchup_cdf'], arrays['matchups.matchup_wicket'], m['bowler_names'], m['batter_names'],
+            resolved={k: arrays[f'matchups.{k}'] for k in ('cdf', 'wicket_prob')})
+    if 'policy_table' in meta:
+        state['policy_table'] = TablePolicy(arrays['policy_table.keys'], arrays['policy_table.actions'],
+                                            meta['policy_table']['score_bucket'])
+    return state
@@ -1,25 +1,28 @@
 import numpy as np
-import json
-import os
+
+from tables import load_tables
+from matchups import load_matchups
 
 class EmpiricalSimulator:
-    def __init__(self, df, empirical_json_path, mappings_path='processed/mappings.json'):
+    def __init__(self, df, empirical_json_path, mappings_path='processed/mappings.json', seed=None, matchups=None):
         self.df = df
-        with open(empirical_json_path, 'r', encoding='utf-8') as f:
-            self.emp = json.load(f)
-
-        if os.path.exists(mappings_path):
-            with open(mappings_path, 'r', encoding='utf-8') as f:
-                m = json.load(f)
-            self.bowler_map = m.get('bowler_map', {})
-            self.batsman_list = m.get('batsman_list', [])
+        self.rng = np.random.default_rng(seed)
+        self.tables = load_tables(empirical_json_path, mappings_path)
+        # optional (phase, bowler, batter) outcome tables; without them outcomes depend on (phase, bowler)
+        self.matchups = load_matchups(matchups)
+
+        if self.tables.batsman_list:
+            self.batsman_list = list(self.tables.batsman_list)
+        elif hasattr(self.df, 'batsman_list'):
+            self.batsman_list = self.df.batsman_list(12)
         else:
-            detected = set(k.split('||')[1] for k in self.emp.keys() if '||' in k)
             self.batsman_list = list(self.df['batsman'].dropna().unique()[:12])
-            self.bowler_map = {f"bowler_{i}": b for i,b in enumerate(list(detected)[:12])}
 
         self.reset_match()
 
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
     def reset_match(self, batting_team_name='TeamA', batting_order=None):
         self.score = 0
         self.wickets = 0
@@ -59,36 +62,33 @@ class EmpiricalSimulator:
         else:
             return 'death'
 
+    def _phase_id(self):
+        if self.over < 6:
+            return 0
+        elif self.over < 16:
+            return 1
+        else:
+            return 2
+
     def sample_ball(self, bowler_name):
         real_bowler = bowler_name
         if isinstance(bowler_name, str) and bowler_name.startswith('bowler_'):
-            real_bowler = self.bowler_map.get(bowler_name, None)
-            if real_bowler is None:
-                try:
-                    idx = int(bowler_name.split('_')[1])
-                    keys = list(self.bowler_map.values())
-                    if 0 <= idx < len(keys):
-                        real_bowler = keys[idx]
-                except Exception:
-                    real_bowler = None
+            real_bowler = None
+            try:
+                idx = int(bowler_name.split('_')[1])
+                if 0 <= idx < self.tables.n_slots:
+                    real_bowler = self.tables.slot_names[idx]
+            except Exception:
+                pass
 
         if not real_bowler:
             real_bowler = bowler_name
 
-        key = f"{self._phase()}||{real_bowler}"
-
-        if key not in self.emp:
-            runs = np.random.choice([0,1,2,3,4,6], p=[0.55,0.25,0.10,0.03,0.06,0.01])
-            wicket = np.random.rand() < 0.03
-            return runs, wicket, real_bowler
-
-        entry = self.emp[key]
-        probs = entry.get('probs_runs', None)
-        if not probs or sum(probs) == 0:
-            runs = np.random.choice([0,1,2,3,4,6])
+        if self.matchups is not None:
+            runs, wicket = self.matchups.sample(self._phase_id(), self.matchups.bowler_id(real_bowler),
+                                                self.matchups.batter_id(self.current_batsman), self.rng)
         else:
-            runs = int(np.random.choice(range(len(probs)), p=probs))
-        wicket = np.random.rand() < entry.get('wicket_prob', 0.03)
+            runs, wicket = self.tables.sample(self._phase_id(), self.tables.bowler_id(real_bowler), self.rng)
         return runs, wicket, real_bowler
 
     def step(self, action):
@@ -115,12 +115,12 @@ class EmpiricalSimulator:
         runs, wicket, real_bowler = self.sample_ball(bowler_name)
 
         if intent == 'aggressive':
-            if np.random.rand() < 0.15:
-                runs = min(6, runs + np.random.choice([0,1,2]))
-            if np.random.rand() < 0.03:
+            if self.rng.random() < 0.15:
+                runs = min(6, runs + int(self.rng.integers(0, 3)))
+            if self.rng.random() < 0.03:
                 wicket = True
         elif intent == 'defensive':
-            if np.random.rand() < 0.6:
+            if self.rng.random() < 0.6:
                 runs = max(0, runs - 1)
 
         striker = self.current_batsman
@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from shared import Artifact, SharedArrays, export_state, import_state
+from projection import (check_state, model_policy, parse_last5, parse_overs, parse_plan, plan_policy,
+                        random_policy, rollout, summarise_rollouts)
+
+CHUNK_SIZE = 2000
+MAX_INNINGS = 1_000_000
+
+log = logging.getLogger(__name__)
+
+
+def parse_scenario(raw, i):
+    """
+    Normalise one scenario: name, batting_order, score/wickets/balls_bowled (or overs
+    "12.3"), last5, innings, seed, policy ("ppo", "dp", "random" or a list of bowler
+    slots per over), intent (for plans) and target.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"scenario {i} must be an object")
+    try:
+        balls = int(raw['balls_bowled']) if 'balls_bowled' in raw else parse_overs(raw.get('overs', '0'))
+        check_state(int(raw.get('score', 0)), int(raw.get('wickets', 0)), balls)
+        last5 = parse_last5(raw.get('last5')).tolist()
+        if not 0 <= int(raw.get('intent', 1)) <= 2:
+            raise ValueError(f"intent must be 0..2, got {raw['intent']}")
+    except ValueError as e:
+        raise ValueError(f"scenario {i}: {e}") from None
+    policy = raw.get('policy', 'ppo')
+    if isinstance(policy, list):
+        try:
+            policy = parse_plan(policy)
+        except ValueError as e:
+            raise ValueError(f"scenario {i}: {e}") from None
+    elif policy not in ('ppo', 'dp', 'random'):
+        raise ValueError(f"scenario {i}: unknown policy {policy!r}")
+    order = raw.get('batting_order')
+    if order is not None and (not isinstance(order, list) or len(order) < 2):
+        raise ValueError(f"scenario {i}: batting_order needs at least two names")
+    if int(raw.get('innings', 1000)) < 1:
+        raise ValueError(f"scenario {i}: innings must be positive")
+    return {
+        'name': str(raw.get('name', f"scenario_{i}")),
+        'batting_order': [str(b) for b in order] if order else None,
+        'score': int(raw.get('score', 0)),
+        'wickets': int(raw.get('wickets', 0)),
+        'balls_bowled': balls,
+        'last5': last5,
+        'innings': int(raw.get('innings', 1000)),
+        'seed': int(raw.get('seed', i)),
+        'policy': policy,
+        'intent': int(raw.get('intent', 1)),
+        'target': None if raw.get('target') is None else int(raw['target']),
+    }
+
+
+class StaleArtifact(RuntimeError):
+    """The artifact a worker was started on was rebuilt (or removed) after its runner was created."""
+
+
+_worker = {}
+
+
+def _init_worker(spec, meta):
+    """Attach to the parent's shared block; tables, policy weights and matchups are views of it."""
+    shared = SharedArrays.attach(spec)
+    _worker.clear()
+    _worker['shared'] = shared
+    _worker['state'] = import_state(shared.arrays, meta)
+
+
+def _init_artifact(path, version):
+    """
+    Map the artifact the parent serves from (see shared.Artifact); its pages are shared with
+    every process. A worker that finds another version (or no file) keeps no state and fails
+    its chunks with StaleArtifact instead of raising here, which would break the whole pool.
+    """
+    _worker.clear()
+    try:
+        art = Artifact(path)
+    except (OSError, ValueError) as e:
+        _worker['stale'] = f"cannot map {path}: {e}"
+        return
+    if art.version != version:
+        _worker['stale'] = f"{path} was rebuilt ({art.version}), expected {version}"
+        return
+    _worker['shared'] = art
+    _worker['state'] = import_state(art.arrays, art.meta)
+
+
+def _policy_for(worker, scenario):
+    tables, policy = worker['state']['tables'], worker['state']['policy']
+    p = scenario['policy']
+    if isinstance(p, list):
+        return plan_policy(p, scenario['intent'])
+    if p == 'random':
+        return random_policy
+    if p == 'dp':
+        if 'dp' not in worker:
+            from planner import solve
+            worker['dp'] = solve(tables)
+        return model_policy(worker['dp'])
+    if policy is None:
+        raise ValueError("no exported PPO policy (.npz) available for sweeps")
+    return model_policy(policy)
+
+
+def _run_on(worker, task):
+    i, scenario, n, seed = task
+    tables, matchups = worker['state']['tables'], worker['state']['matchups']
+    state = {k: scenario[k] for k in ('score', 'wickets', 'balls_bowled')}
+    recent = np.asarray(scenario['last5'], dtype=np.float32)
+    score, wickets, batsmen = rollout(tables, _policy_for(worker, scenario), n, state, recent,
+                                      np.random.default_rng(seed), matchups, scenario['batting_order'])
+    return i, score, wickets, batsmen
+
+
+def _run_chunk(task):
+    if 'stale' in _worker:
+        raise StaleArtifact(_worker['stale'])
+    return _run_on(_worker, task)
+
+
+def tasks(scenarios, chunk_size=CHUNK_SIZE):
+    """Chunks of each scenario with seeds spawned from the scenario seed, so results do not depend on workers."""
+    for i, s in enumerate(scenarios):
+        n_chunks = (s['innings'] + chunk_size - 1) // chunk_size
+        for c, seed in enumerate(np.random.SeedSequence(s['seed']).spawn(n_chunks)):
+            yield i, s, min(chunk_size, s['innings'] - c * chunk_size), seed
+
+
+def _artifact_version(path):
+    try:
+        return Artifact(path).version
+    except (OSError, ValueError):
+        return None
+
+
+def _copy_result(out):
+    def copy(f):
+        if f.cancelled():
+            out.cancel()
+        elif f.exception() is not None:
+            out.set_exception(f.exception())
+        else:
+            out.set_result(f.result())
+    return copy
+
+
+class SweepRunner:
+    """
+    Runs scenario sweeps on a pool of worker processes.
+
+    The compiled tables, PPO weights (a NumpyPolicy) and matchup tables are copied once
+    into shared memory; workers attach to it at start-up instead of loading their own.
+    When the same state is already in a shared.Artifact, pass `artifact=(path, version)`
+    and workers map that file instead, so no copy is made at all. If the file is rebuilt
+    while the runner is in use, the runner switches to a shared-memory copy and resubmits
+    the chunks that found the new file. `version` labels the tables the runner was built
+    from; jobs.py records it with each job.
+    Workers come from a forkserver, not a fork of the (possibly multithreaded) caller.
+    With workers <= 1 everything runs in the calling process, on state held by the runner
+    itself, so several in-process runners (e.g. old and new tables) do not interfere.
+    """
+
+    def __init__(self, tables, policy=None, matchups=None, workers=None, chunk_size=CHUNK_SIZE, artifact=None,
+                 version=None):
+        self.workers = int(workers or os.cpu_count() or 1)
+        self.version = version
+        self.chunk_size = int(chunk_size)
+        arrays, meta = export_state(tables, policy, matchups)
+        self.batsman_list = list(tables.batsman_list)
+        self.shared = None
+        self.pool = None
+        self._local = None
+        self._lock = threading.Lock()
+        if self.workers <= 1:
+            self._local = {'shared': None, 'state': import_state(arrays, meta)}
+        elif artifact is not None and _artifact_version(artifact[0]) == artifact[1]:
+            self._state = (arrays, meta)  # for _fall_back
+            self.pool = self._start_pool(_init_artifact, tuple(artifact))
+        else:
+            if artifact is not None:
+                log.warning("%s does not hold version %s; sharing a copy of the state instead", *artifact)
+            self.shared = SharedArrays.create(arrays)
+            self.pool = self._start_pool(_init_worker, (self.shared.spec, meta))
+
+    def _start_pool(self, initializer, initargs):
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('forkserver'),
+                                   initializer=initializer, initargs=initargs)
+
+    def _fall_back(self, pool):
+        """Replace an artifact-backed `pool` whose workers found a rebuilt file with one on shared memory."""
+        with self._lock:
+            if self.pool is pool:
+                arrays, meta = self._state
+                log.warning("shared state artifact was rebuilt; sweep workers now use a copy of the state")
+                self.shared = SharedArrays.create(arrays)
+                self.pool = self._start_pool(_init_worker, (self.shared.spec, meta))
+                pool.shutdown(wait=False)
+            return self.pool
+
+    @property
+    def broken(self):
+        """True when a worker died and the pool can no longer run chunks."""
+        return bool(self.pool is not None and getattr(self.pool, '_broken', False))
+
+    def submit(self, task):
+        """Future for one chunk from tasks(); without a pool the chunk runs in the calling thread."""
+        if self.pool is None:
+            f = Future()
+            try:
+                f.set_result(_run_on(self._local, task))
+            except Exception as e:
+                f.set_exception(e)
+            return f
+
+        pool, out = self.pool, Future()
+
+        def done(f):
+            if not f.cancelled() and isinstance(f.exception(), StaleArtifact):
+                try:
+                    f = self._fall_back(pool).submit(_run_chunk, task)
+                except Exception as e:
+                    out.set_exception(e)
+                    return
+                f.add_done_callback(_copy_result(out))
+            else:
+                _copy_result(out)(f)
+
+        pool.submit(_run_chunk, task).add_done_callback(done)
+        return out
+
+    def iter_run(self, scenarios):
+        """
+        Yield ("progress", {...}) after every finished chunk, then ("result", {...}) with
+        per-scenario summaries and overall throughput.
+        """
+        scenarios = [parse_scenario(s, i) for i, s in enumerate(scenarios)]
+        total = sum(s['innings'] for s in scenarios)
+        if total > MAX_INNINGS:
+            raise ValueError(f"{total} innings requested, limit is {MAX_INNINGS}")
+
+        t0 = time.perf_counter()
+        parts = [[] for _ in scenarios]
+        done = 0
+        if self.pool is None:
+            results = (_run_on(self._local, t) for t in tasks(scenarios, self.chunk_size))
+        else:
+            results = (f.result() for f in as_completed([self.submit(t) for t in tasks(scenarios, self.chunk_size)]))
+        for i, score, wickets, batsmen in results:
+            parts[i].append((score, wickets, batsmen))
+            done += len(score)
+            elapsed = time.perf_counter() - t0
+            yield 'progress', {'innings_done': done, 'innings_total': total, 'elapsed_s': round(elapsed, 2),
+                               'innings_per_sec': round(done / elapsed, 1) if elapsed else 0.0}
+
+        out = []
+        for s, chunks in zip(scenarios, parts):
+            score, wickets, batsmen = (np.concatenate(p) for p in zip(*chunks))
+            order = s['batting_order'] or self.batsman_list
+            summary = summarise_rollouts(score, wickets, s['target'])
+            summary['batsmen_runs'] = {str(order[j]) if j < len(order) else f"batsman_{j + 1}": float(r)
+                                       for j, r in enumerate(batsmen.mean(axis=0))}
+            out.append({'name': s['name'], 'policy': s['policy'], 'batting_order': s['batting_order'],
+                        'start': {k: s[k] for k in ('score', 'wickets', 'balls_bowled')}, **summary})
+        elapsed = time.perf_counter() - t0
+        yield 'result', {'scenarios': out, 'innings': total, 'workers': self.workers,
+                         'elapsed_s': round(elapsed, 2), 'innings_per_sec': round(total / elapsed, 1)}
+
+    def run(self, scenarios, progress=None):
+        for kind, item in self.iter_run(scenarios):
+            if kind == 'result':
+                return item
+            if progress is not None:
+                progress(item)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.shared is not None:
+            self.shared.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('scenarios', help='JSON file with a list of scenarios (see parse_scenario)')
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--policy', default='models/ppo_cricket_policy.npz', help='exported PPO actor (.npz)')
+    parser.add_argument('--matchups', default='processed/matchup_tables.npz', help='used when the file exists')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--out', default='results/sweep.json')
+    args = parser.parse_args()
+
+    from tables import load_tables
+    from numpy_policy import NumpyPolicy
+    from matchups import MatchupTables
+
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    tables = load_tables(args.empirical, args.mappings)
+    policy = NumpyPolicy.load(args.policy) if os.path.exists(args.policy) else None
+    matchups = MatchupTables.load(args.matchups) if os.path.exists(args.matchups) else None
+
+    runner = SweepRunner(tables, policy, matchups, workers=args.workers, chunk_size=args.chunk_size)
+    try:
+        report = runner.run(scenarios, progress=lambda p: print(
+            f"\r{p['innings_done']}/{p['innings_total']} innings, {p['innings_per_sec']:.0f}/s", end='', flush=True))
+    finally:
+        runner.close()
+    print()
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    for s in report['scenarios']:
+        q = s['final_score']['quantiles']
+        print(f"{s['name']:20s} {s['final_score']['mean']:6.1f} [{q['p5']:.0f}-{q['p95']:.0f}] "
+              f"wkts {s['wickets']['mean']:.2f}")
+    print(f"{report['innings']} innings in {report['elapsed_s']}s ({report['innings_per_sec']} innings/s, "
+          f"{report['workers']} workers)")
+    print(f"Saved sweep → {args.out}")
@@ -0,0 +1,242 @@
+import numpy as np
+import json
+import os
+import argparse
+
+PHASES = ['powerplay', 'middle', 'death']
+PHASE_IDS = {p: i for i, p in enumerate(PHASES)}
+
+DEFAULT_RUN_PROBS = [0.55, 0.25, 0.10, 0.03, 0.06, 0.0, 0.01]
+DEFAULT_WICKET_PROB = 0.03
+UNIFORM_RUN_PROBS = [1 / 6, 1 / 6, 1 / 6, 1 / 6, 1 / 6, 0.0, 1 / 6]
+
+
+class CompiledTables:
+    """
+    Integer-indexed view of the empirical tables.
+
+    cdf[phase_id, bowler_id, 7] and wicket_prob[phase_id, bowler_id] hold one row per
+    known bowler plus a final default row (bowler_id == default_id) used for unknown
+    bowlers and for (phase, bowler) pairs missing from the source tables.
+    slot_names lists the bowler mapped to each of the agent's bowler_<i> slots.
+
+    Tables built from deliveries also keep the raw run_counts[phase, bowler, 7],
+    wicket_counts[phase, bowler] and the match_ids they include, so new matches can be
+    folded in later without reprocessing history (see OutcomeCounter.from_tables).
+    """
+
+    def __init__(self, cdf, wicket_prob, bowler_names, slot_names, batsman_list, sample_count=None,
+                 run_counts=None, wicket_counts=None, match_ids=None):
+        self.cdf = cdf
+        self.wicket_prob = wicket_prob
+        self.bowler_names = [str(b) for b in bowler_names]
+        self.slot_names = [str(b) for b in slot_names]
+        self.batsman_list = [str(b) for b in batsman_list]
+        self.sample_count = sample_count
+        self.run_counts = run_counts
+        self.wicket_counts = wicket_counts
+        self.match_ids = match_ids
+        self.default_id = len(self.bowler_names)
+        self.bowler_index = {b: i for i, b in enumerate(self.bowler_names)}
+        self.slot_ids = np.array([self.bowler_id(b) for b in self.slot_names], dtype=np.int64)
+
+    @classmethod
+    def from_json(cls, empirical_json_path, mappings_path='processed/mappings.json'):
+        with open(empirical_json_path, 'r', encoding='utf-8') as f:
+            emp = json.load(f)
+
+        if os.path.exists(mappings_path):
+            with open(mappings_path, 'r', encoding='utf-8') as f:
+                m = json.load(f)
+            bowler_map = m.get('bowler_map', {})
+            batsman_list = m.get('batsman_list', [])
+        else:
+            detected = set(k.split('||')[1] for k in emp.keys() if '||' in k)
+            bowler_map = {f"bowler_{i}": b for i, b in enumerate(list(detected)[:12])}
+            batsman_list = []
+
+        names = sorted(set(k.split('||', 1)[1] for k in emp.keys() if '||' in k))
+        index = {b: i for i, b in enumerate(names)}
+        default_id = len(names)
+
+        probs = np.tile(np.asarray(DEFAULT_RUN_PROBS, dtype=np.float64), (len(PHASES), default_id + 1, 1))
+        wicket_prob = np.full((len(PHASES), default_id + 1), DEFAULT_WICKET_PROB, dtype=np.float64)
+        sample_count = np.zeros((len(PHASES), default_id + 1), dtype=np.int64)
+
+        for key, entry in emp.items():
+            if '||' not in key:
+                continue
+            phase, bowler = key.split('||', 1)
+            if phase not in PHASE_IDS:
+                continue
+            p, b = PHASE_IDS[phase], index[bowler]
+            row = entry.get('probs_runs', None)
+            probs[p, b] = UNIFORM_RUN_PROBS if not row or sum(row) == 0 else row
+            wicket_prob[p, b] = entry.get('wicket_prob', DEFAULT_WICKET_PROB)
+            sample_count[p, b] = entry.get('sample_count', 0)
+
+        values = list(bowler_map.values())
+        slot_names = [bowler_map.get(f"bowler_{i}", values[i]) for i in range(len(values))]
+
+        cdf = np.cumsum(probs, axis=2)
+        cdf /= cdf[:, :, -1:]
+        return cls(cdf, wicket_prob, names, slot_names, batsman_list, sample_count)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            optional = {k: z[k] for k in ('run_counts', 'wicket_counts', 'match_ids') if k in z.files}
+            return cls(z['cdf'], z['wicket_prob'], z['bowler_names'], z['slot_names'],
+                       z['batsman_list'], z['sample_count'], **optional)
+
+    def save(self, path):
+        """Write atomically, so readers polling the file never see a partial artifact."""
+        arrays = {
+            'cdf': self.cdf,
+            'wicket_prob': self.wicket_prob,
+            'bowler_names': np.array(self.bowler_names, dtype=str),
+            'slot_names': np.array(self.slot_names, dtype=str),
+            'batsman_list': np.array(self.batsman_list, dtype=str),
+            'sample_count': self.sample_count,
+        }
+        for k in ('run_counts', 'wicket_counts', 'match_ids'):
+            if getattr(self, k) is not None:
+                arrays[k] = getattr(self, k)
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @property
+    def n_slots(self):
+        return len(self.slot_ids)
+
+    def bowler_id(self, name):
+        return self.bowler_index.get(name, self.default_id)
+
+    def slot_to_id(self, slots):
+        """Vectorized bowler_<i> slot -> bowler id; out-of-range slots map to the default row."""
+        slots = np.asarray(slots, dtype=np.int64)
+        ids = np.append(self.slot_ids, self.default_id)
+        return ids[np.where((slots >= 0) & (slots < self.n_slots), slots, self.n_slots)]
+
+    def sample(self, phase_id, bowler_id, rng):
+        runs = int(np.searchsorted(self.cdf[phase_id, bowler_id], rng.random(), side='right'))
+        wicket = rng.random() < self.wicket_prob[phase_id, bowler_id]
+        return min(runs, 6), bool(wicket)
+
+
+class OutcomeCounter:
+    """
+    Accumulates delivery counts per (phase, bowler, runs_bucket) and wicket counts per
+    (phase, bowler) with one np.bincount per batch. Bowler names get integer ids in
+    order of first appearance, so batches (e.g. CSV chunks) can be added one by one.
+    """
+
+    def __init__(self):
+        self.bowler_index = {}
+        self.run_counts = np.zeros((len(PHASES), 0, 7), dtype=np.int64)
+        self.wicket_counts = np.zeros((len(PHASES), 0), dtype=np.int64)
+        self.match_ids = set()
+
+    @classmethod
+    def from_tables(cls, tables):
+        if tables.run_counts is None:
+            raise ValueError("tables carry no raw counts; rebuild them with data_prep.py")
+        counter = cls()
+        counter.bowler_index = {b: i for i, b in enumerate(tables.bowler_names)}
+        counter.run_counts = np.array(tables.run_counts, dtype=np.int64)
+        counter.wicket_counts = np.array(tables.wicket_counts, dtype=np.int64)
+        if tables.match_ids is not None:
+            counter.match_ids = set(tables.match_ids.tolist())
+        return counter
+
+    @property
+    def bowler_names(self):
+        return list(self.bowler_index)
+
+    def _encode(self, bowlers):
+        import pandas as pd  # prep-time only; keeps pandas out of serving imports
+        codes, names = pd.factorize(np.asarray(bowlers), use_na_sentinel=False)
+        for name in names:
+            self.bowler_index.setdefault(str(name), len(self.bowler_index))
+        ids = np.array([self.bowler_index[str(n)] for n in names], dtype=np.int64)
+        return ids[codes]
+
+    def add(self, phase_ids, bowlers, runs_bucket, wicket, match_ids=None):
+        if match_ids is not None:
+            self.match_ids.update(np.unique(match_ids).tolist())
+        bowler_ids = self._encode(bowlers)
+        nb = len(self.bowler_index)
+        if nb > self.run_counts.shape[1]:
+            grow = nb - self.run_counts.shape[1]
+            self.run_counts = np.pad(self.run_counts, ((0, 0), (0, grow), (0, 0)))
+            self.wicket_counts = np.pad(self.wicket_counts, ((0, 0), (0, grow)))
+
+        cell = np.asarray(phase_ids, dtype=np.int64) * nb + bowler_ids
+        runs = np.clip(np.asarray(runs_bucket, dtype=np.int64), 0, 6)
+        self.run_counts += np.bincount(cell * 7 + runs, minlength=len(PHASES) * nb * 7).reshape(len(PHASES), nb, 7)
+        self.wicket_counts += np.bincount(cell, weights=np.asarray(wicket, dtype=np.float64),
+                                          minlength=len(PHASES) * nb).astype(np.int64).reshape(len(PHASES), nb)
+
+    def top_bowlers(self, n=12):
+        totals = self.run_counts.sum(axis=(0, 2))
+        order = np.argsort(-totals, kind='stable')[:n]
+        names = self.bowler_names
+        return [names[i] for i in order]
+
+    def to_tables(self, slot_names, batsman_list=()):
+        names = self.bowler_names
+        order = np.argsort(np.asarray(names, dtype=str), kind='stable')
+        run_counts = self.run_counts[:, order]
+        wicket_counts = self.wicket_counts[:, order]
+        total = run_counts.sum(axis=2)
+
+        probs = np.tile(np.asarray(DEFAULT_RUN_PROBS, dtype=np.float64), (len(PHASES), len(names) + 1, 1))
+        wicket_prob = np.full((len(PHASES), len(names) + 1), DEFAULT_WICKET_PROB, dtype=np.float64)
+        seen = total > 0
+        probs[:, :-1][seen] = run_counts[seen] / total[seen][:, None]
+        wicket_prob[:, :-1][seen] = wicket_counts[seen] / total[seen]
+
+        cdf = np.cumsum(probs, axis=2)
+        cdf /= cdf[:, :, -1:]
+        sample_count = np.zeros((len(PHASES), len(names) + 1), dtype=np.int64)
+        sample_count[:, :-1] = total
+        return CompiledTables(cdf, wicket_prob, [names[i] for i in order], slot_names, batsman_list, sample_count,
+                              run_counts=run_counts, wicket_counts=wicket_counts,
+                              match_ids=np.array(sorted(self.match_ids)))
+
+    def to_json_dict(self):
+        """Same layout as the legacy empirical_tables.json."""
+        emp = {}
+        names = self.bowler_names
+        total = self.run_counts.sum(axis=2)
+        for p, b in zip(*np.nonzero(total)):
+            key = f"{PHASES[p]}||{names[b]}"
+            emp[key] = {
+                'probs_runs': (self.run_counts[p, b] / total[p, b]).tolist(),
+                'wicket_prob': float(self.wicket_counts[p, b] / total[p, b]),
+                'sample_count': int(total[p, b])
+            }
+        return dict(sorted(emp.items()))
+
+
+def load_tables(path, mappings_path='processed/mappings.json'):
+    """Accepts a compiled .npz, a source empirical JSON, or an already loaded CompiledTables."""
+    if isinstance(path, CompiledTables):
+        return path
+    if str(path).endswith('.npz'):
+        return CompiledTables.load(path)
+    return CompiledTables.from_json(path, mappings_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--empirical', default='processed/empirical_tables.json')
+    parser.add_argument('--mappings', default='processed/mappings.json')
+    parser.add_argument('--out', default='processed/empirical_tables.npz')
+    args = parser.parse_args()
+
+    tables = CompiledTables.from_json(args.empirical, args.mappings)
+    tables.save(args.out)
+    print(f"Saved compiled tables → {args.out} ({len(tables.bowler_names)} bowlers, {tables.n_slots} slots)")
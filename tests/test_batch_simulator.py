@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_simulator import MAX_BALLS, MAX_WICKETS, BatchSimulator
+from simulator import EmpiricalSimulator
+
+EMPIRICAL = 'processed/empirical_tables.npz'
+MAPPINGS = 'processed/mappings.json'
+
+
+@pytest.fixture(scope='module', autouse=True)
+def tables_present():
+    if not os.path.exists(EMPIRICAL):
+        pytest.skip(f"{EMPIRICAL} missing")
+
+
+def scripted(seed, n_balls=150):
+    """Fixed ball outcomes (runs, wicket) so both simulators see the same innings."""
+    rng = np.random.default_rng(seed)
+    return rng.choice([0, 1, 2, 3, 4, 6], n_balls), rng.random(n_balls) < 0.06
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rules_match_scalar_simulator(seed):
+    runs, wickets = scripted(seed)
+    scalar = EmpiricalSimulator(pd.DataFrame({'batsman': []}), EMPIRICAL, mappings_path=MAPPINGS)
+    batch = BatchSimulator(EMPIRICAL, 1, mappings_path=MAPPINGS)
+    order = scalar.batting_order
+    scalar.sample_ball = lambda bowler: (int(runs[scalar.balls_bowled]), bool(wickets[scalar.balls_bowled]), bowler)
+    batch.sample_ball = lambda rows, bowler: (runs[batch.balls_bowled[rows]], wickets[batch.balls_bowled[rows]])
+
+    while not scalar.done:
+        scalar.step([3, 1])
+        out = batch.step(np.array([3]))
+        assert out['match_end'][0] == scalar.done
+        assert (batch.score[0], batch.wickets[0], batch.balls_bowled[0]) == \
+               (scalar.score, scalar.wickets, scalar.balls_bowled)
+        assert order[batch.striker[0]] == scalar.current_batsman
+        assert order[batch.non_striker[0]] == scalar.non_striker
+    assert batch.done[0]
+    assert scalar.balls_bowled == MAX_BALLS or scalar.wickets == MAX_WICKETS
+    assert [scalar.batsman_scores.get(name, 0) for name in order] == batch.batsman_scores[0, :len(order)].tolist()
+
+
+def test_score_distribution_matches_scalar_simulator():
+    n_scalar = 400
+    scalar = EmpiricalSimulator(pd.DataFrame({'batsman': []}), EMPIRICAL, mappings_path=MAPPINGS, seed=0)
+    bowlers = np.random.default_rng(1).integers(0, 10, (n_scalar, MAX_BALLS))
+    totals = []
+    for i in range(n_scalar):
+        scalar.reset_match()
+        while not scalar.done:
+            scalar.step([bowlers[i, scalar.balls_bowled], 1])
+        totals.append(scalar.score)
+    totals = np.array(totals)
+
+    batch = BatchSimulator(EMPIRICAL, 20000, mappings_path=MAPPINGS, seed=2)
+    batch.run(lambda sim: (sim.rng.integers(0, 10, sim.n), None))
+    se = np.sqrt(totals.var() / len(totals) + batch.score.var() / batch.n)
+    assert abs(totals.mean() - batch.score.mean()) < 4 * se
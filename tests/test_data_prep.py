@@ -0,0 +1,75 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_prep import prepare_data, prepare_data_streaming, update_tables
+from tables import CompiledTables
+
+PROCESSED = 'processed/deliveries_processed.parquet'
+MAPPINGS = 'processed/mappings.json'
+DERIVED = ['runs_cumulative', 'wicket', 'balls_bowled', 'balls_left', 'over_ball']
+N_MATCHES = 40
+
+
+@pytest.fixture(scope='module')
+def deliveries():
+    """Raw-looking deliveries for the first N_MATCHES matches of the bundled data."""
+    if not os.path.exists(PROCESSED):
+        pytest.skip(f"{PROCESSED} missing")
+    df = pd.read_parquet(PROCESSED).drop(columns=DERIVED)
+    return df[df['match_id'].isin(df['match_id'].unique()[:N_MATCHES])]
+
+
+def write_csv(df, path):
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def out_dir(tmp_path, name):
+    path = tmp_path / name
+    path.mkdir()
+    shutil.copy(MAPPINGS, path / 'mappings.json')
+    return str(path)
+
+
+def assert_same_tables(a, b):
+    a = CompiledTables.load(os.path.join(a, 'empirical_tables.npz'))
+    b = CompiledTables.load(os.path.join(b, 'empirical_tables.npz'))
+    assert a.bowler_names == b.bowler_names
+    assert a.slot_names == b.slot_names
+    for k in ('cdf', 'wicket_prob', 'run_counts', 'wicket_counts', 'match_ids'):
+        assert np.array_equal(getattr(a, k), getattr(b, k)), k
+
+
+def test_streaming_matches_in_memory(deliveries, tmp_path):
+    csv = write_csv(deliveries, tmp_path / 'deliveries.csv')
+    full, streamed = out_dir(tmp_path, 'full'), out_dir(tmp_path, 'streamed')
+    prepare_data(csv, full)
+    # small chunks so innings are split across chunk boundaries
+    prepare_data_streaming(csv, streamed, chunksize=997)
+
+    assert_same_tables(full, streamed)
+    a = pd.read_parquet(os.path.join(full, 'deliveries_processed.parquet'))
+    b = pd.read_parquet(os.path.join(streamed, 'deliveries_processed.parquet'))
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_update_matches_full_rebuild_and_is_idempotent(deliveries, tmp_path):
+    ids = deliveries['match_id'].unique()
+    old = deliveries[deliveries['match_id'].isin(ids[:N_MATCHES // 2])]
+    new = deliveries[deliveries['match_id'].isin(ids[N_MATCHES // 2:])]
+    full, updated = out_dir(tmp_path, 'full'), out_dir(tmp_path, 'updated')
+    prepare_data(write_csv(deliveries, tmp_path / 'all.csv'), full)
+    prepare_data(write_csv(old, tmp_path / 'old.csv'), updated)
+
+    new_csv = write_csv(new, tmp_path / 'new.csv')
+    update_tables(new_csv, updated, chunksize=997)
+    assert_same_tables(full, updated)
+
+    npz = tmp_path / 'updated' / 'empirical_tables.npz'
+    before = (npz.stat().st_mtime_ns, npz.read_bytes())
+    update_tables(new_csv, updated)
+    assert (npz.stat().st_mtime_ns, npz.read_bytes()) == before
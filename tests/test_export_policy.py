@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('stable_baselines3')
+
+from stable_baselines3 import PPO
+
+from export_policy import export_policy, sample_observations
+from numpy_policy import NumpyPolicy
+
+MODEL_PATH = 'models/ppo_cricket.zip'
+
+
+@pytest.fixture(scope='module')
+def model():
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip(f"{MODEL_PATH} missing")
+    return PPO.load(MODEL_PATH, device='cpu')
+
+
+@pytest.fixture(scope='module')
+def exported(model, tmp_path_factory):
+    policy = export_policy(model)
+    path = str(tmp_path_factory.mktemp('policy') / 'policy.npz')
+    policy.save(path)
+    return NumpyPolicy.load(path)
+
+
+def test_batched_actions_match_sb3(model, exported):
+    obs = sample_observations(2000, seed=1)
+    expected, _ = model.predict(obs, deterministic=True)
+    actual, _ = exported.predict(obs, deterministic=True)
+    assert actual.shape == expected.shape
+    assert np.array_equal(actual, expected)
+
+
+def test_single_actions_match_sb3(model, exported):
+    for obs in sample_observations(50, seed=2):
+        expected, _ = model.predict(obs, deterministic=True)
+        actual, _ = exported.predict(obs, deterministic=True)
+        assert actual.shape == expected.shape
+        assert np.array_equal(actual, expected)
@@ -0,0 +1,94 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from jobs import MAX_CHUNK_SIZE, Job, JobQueue
+from sweep import SweepRunner, parse_scenario
+from tables import CompiledTables, load_tables
+
+EMPIRICAL = 'processed/empirical_tables.npz'
+MAPPINGS = 'processed/mappings.json'
+SCENARIOS = [
+    {'name': 'from ball 0', 'innings': 1000, 'seed': 5, 'policy': 'random'},
+    {'name': 'chase', 'overs': '12.0', 'score': 95, 'wickets': 2, 'innings': 600, 'seed': 6, 'policy': [2] * 20,
+     'target': 170},
+]
+CHUNK = 200
+
+
+@pytest.fixture(scope='module')
+def tables():
+    if not os.path.exists(EMPIRICAL):
+        pytest.skip(f"{EMPIRICAL} missing")
+    return load_tables(EMPIRICAL, MAPPINGS)
+
+
+@pytest.fixture(scope='module')
+def runner(tables):
+    return SweepRunner(tables, workers=1, version='v1')
+
+
+@pytest.fixture(scope='module')
+def uninterrupted(runner, tmp_path_factory):
+    job = JobQueue(runner, str(tmp_path_factory.mktemp('jobs')), max_running=1).submit(SCENARIOS, CHUNK)
+    return wait_for(job)
+
+
+def wait_for(job, timeout=60):
+    deadline = time.time() + timeout
+    while job.status != 'done' and time.time() < deadline:
+        time.sleep(0.02)
+    assert job.status == 'done', job.error
+    return job
+
+
+def interrupted_job(jobs_dir, runner, n_chunks, version):
+    """A job as a crashed process leaves it: status running, the first n_chunks saved."""
+    scenarios = [parse_scenario(s, i) for i, s in enumerate(SCENARIOS)]
+    job = Job('interrupted', scenarios, CHUNK, os.path.join(jobs_dir, 'interrupted'))
+    job.status, job.tables_version = 'running', version
+    for k in range(n_chunks):
+        job.add(k, runner.submit(job.tasks[k]).result())
+    job.save()
+    return job
+
+
+def assert_same_aggregates(job, expected):
+    assert job.chunk_done.all()
+    np.testing.assert_array_equal(job.score_counts, expected.score_counts)
+    np.testing.assert_array_equal(job.wicket_counts, expected.wicket_counts)
+    np.testing.assert_array_equal(job.batsmen_runs, expected.batsmen_runs)
+
+
+@pytest.mark.parametrize('chunk_size', [0, MAX_CHUNK_SIZE + 1])
+def test_chunk_size_out_of_range_is_rejected(runner, tmp_path, chunk_size):
+    jobs = JobQueue(runner, str(tmp_path), max_running=1)
+    with pytest.raises(ValueError, match='chunk_size'):
+        jobs.submit(SCENARIOS, chunk_size)
+    assert not jobs.jobs
+
+
+@pytest.mark.parametrize('n_chunks', [1, 5])
+def test_resumed_job_matches_uninterrupted_run(runner, uninterrupted, tmp_path, n_chunks):
+    interrupted_job(str(tmp_path), runner, n_chunks, 'v1')
+    job = wait_for(JobQueue(runner, str(tmp_path), max_running=1).get('interrupted'))
+    assert job.session_innings == job.innings_total - n_chunks * CHUNK
+    assert_same_aggregates(job, uninterrupted)
+    assert_same_aggregates(Job.load(job.path), uninterrupted)
+
+
+def test_job_restarts_when_tables_change(tables, runner, uninterrupted, tmp_path, caplog):
+    sixes = np.zeros_like(tables.cdf)
+    sixes[..., -1] = 1.0
+    old = SweepRunner(CompiledTables(sixes, tables.wicket_prob, tables.bowler_names, tables.slot_names,
+                                     tables.batsman_list), workers=1, version='v0')
+    interrupted_job(str(tmp_path), old, 4, 'v0')
+
+    with caplog.at_level('INFO', logger='jobs'):
+        job = wait_for(JobQueue(runner, str(tmp_path), max_running=1).get('interrupted'))
+    assert 'tables changed (v0 → v1), starting over' in caplog.text
+    assert job.tables_version == 'v1'
+    assert job.session_innings == job.innings_total
+    assert_same_aggregates(job, uninterrupted)
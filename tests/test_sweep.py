@@ -0,0 +1,108 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from jobs import JobQueue
+from projection import summarise_counts, summarise_rollouts
+from shared import export_state, write_artifact
+from sweep import SweepRunner
+from tables import CompiledTables, load_tables
+
+EMPIRICAL = 'processed/empirical_tables.npz'
+MAPPINGS = 'processed/mappings.json'
+SCENARIOS = [
+    {'name': 'from ball 0', 'innings': 1200, 'seed': 3, 'policy': 'random', 'target': 150},
+    {'name': 'death overs', 'overs': '16.0', 'score': 140, 'wickets': 4, 'innings': 700, 'seed': 4,
+     'policy': [3] * 20, 'intent': 2, 'target': 190},
+]
+
+
+@pytest.fixture(scope='module')
+def tables():
+    if not os.path.exists(EMPIRICAL):
+        pytest.skip(f"{EMPIRICAL} missing")
+    return load_tables(EMPIRICAL, MAPPINGS)
+
+
+def summaries(scenarios):
+    return [{k: v for k, v in s.items() if k not in ('policy', 'batting_order', 'start', 'innings_done')}
+            for s in scenarios]
+
+
+def assert_close(got, expected):
+    """Nested dicts/lists equal, floats up to rounding."""
+    if isinstance(expected, dict):
+        assert got.keys() == expected.keys()
+        for k in expected:
+            assert_close(got[k], expected[k])
+    elif isinstance(expected, list):
+        assert len(got) == len(expected)
+        for g, e in zip(got, expected):
+            assert_close(g, e)
+    else:
+        assert got == pytest.approx(expected)
+
+
+def test_summarise_counts_matches_summarise_rollouts():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        final = rng.integers(40, 260, rng.integers(1, 3000))
+        wickets = rng.integers(0, 11, len(final))
+        expected = summarise_rollouts(final, wickets, target=160)
+        got = summarise_counts(np.bincount(final, minlength=1024), np.bincount(wickets, minlength=11), target=160)
+        assert_close(got, expected)
+
+
+def test_job_results_match_sweep(tables, tmp_path):
+    runner = SweepRunner(tables, workers=1, chunk_size=250, version='v1')
+    swept = summaries(runner.run(SCENARIOS)['scenarios'])
+
+    jobs = JobQueue(runner, str(tmp_path), max_running=1)
+    job = jobs.submit(SCENARIOS, chunk_size=250)
+    deadline = time.time() + 60
+    while job.status != 'done' and time.time() < deadline:
+        time.sleep(0.05)
+    assert job.status == 'done', job.error
+
+    assert [r['innings_done'] for r in job.results()] == [s['n_rollouts'] for s in swept]
+    assert_close(summaries(job.results()), swept)
+
+
+def test_in_process_runners_keep_their_own_state(tables):
+    sixes = np.zeros_like(tables.cdf)
+    sixes[..., -1] = 1.0
+    other = CompiledTables(sixes, tables.wicket_prob, tables.bowler_names, tables.slot_names, tables.batsman_list)
+
+    runner = SweepRunner(tables, workers=1)
+    before = summaries(runner.run(SCENARIOS)['scenarios'])
+    other_runner = SweepRunner(other, workers=1)
+    assert summaries(other_runner.run(SCENARIOS)['scenarios']) != before
+    assert summaries(runner.run(SCENARIOS)['scenarios']) == before
+
+
+def test_rebuilt_artifact_falls_back_to_shared_memory(tables, tmp_path):
+    path = str(tmp_path / 'state.bin')
+    expected = summaries(SweepRunner(tables, workers=1, chunk_size=250).run(SCENARIOS)['scenarios'])
+    write_artifact(path, *export_state(tables), 'v1')
+
+    runner = SweepRunner(tables, workers=2, chunk_size=250, artifact=(path, 'v1'))
+    try:
+        # rebuilt before the lazily started workers map it, as after a reload in another process
+        sixes = np.zeros_like(tables.cdf)
+        sixes[..., -1] = 1.0
+        other = CompiledTables(sixes, tables.wicket_prob, tables.bowler_names, tables.slot_names, tables.batsman_list)
+        write_artifact(path, *export_state(other), 'v2')
+        assert summaries(runner.run(SCENARIOS)['scenarios']) == expected
+        assert not runner.broken and runner.shared is not None
+        assert summaries(runner.run(SCENARIOS)['scenarios']) == expected
+    finally:
+        runner.close()
+
+    runner = SweepRunner(tables, workers=2, chunk_size=250, artifact=(path, 'v1'))
+    try:
+        assert runner.shared is not None
+        assert summaries(runner.run(SCENARIOS)['scenarios']) == expected
+    finally:
+        runner.close()
@@ -1,43 +1,87 @@
 import os
+import time
 import argparse
 import pandas as pd
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
 
 from simulator import EmpiricalSimulator
 from env import CricketEnv
+from tables import load_tables
+from delivery_store import DeliveryStore
+from vec_env import CricketVectorEnv
 from utils import ensure_dir
 
 
-def train(env, total_timesteps=200_000, model_path='models/ppo_cricket'):
+def make_env(data_path, empirical_path, mappings_path, seed):
+    """
+    Returns a picklable thunk that builds an env inside the worker process.
+    The compiled tables carry the batting list, so deliveries are only read when no
+    mappings are available: from a delivery store directory (memory mapped, shared
+    between workers) or else just the batsman column of the parquet file.
+    """
+    def _init():
+        tables = load_tables(empirical_path, mappings_path)
+        if tables.batsman_list:
+            df = None
+        elif os.path.isdir(data_path):
+            df = DeliveryStore(data_path)
+        else:
+            df = pd.read_parquet(data_path, columns=['batsman'])
+        sim = EmpiricalSimulator(df, tables, seed=seed)
+        env = CricketEnv(sim)
+        env.reset(seed=seed)
+        return env
+    return _init
+
+
+def build_vec_env(backend, n_envs, data_path, empirical_path, mappings_path, seed=0):
+    if backend == 'batched':
+        return CricketVectorEnv(empirical_path, n_envs, mappings_path=mappings_path, seed=seed)
+
+    env_fns = [make_env(data_path, empirical_path, mappings_path, seed + rank) for rank in range(n_envs)]
+    if backend == 'subproc':
+        return SubprocVecEnv(env_fns)
+    return DummyVecEnv(env_fns)
+
+
+def train(env, total_timesteps=200_000, model_path='models/ppo_cricket', seed=None):
     ensure_dir(os.path.dirname(model_path))
-    vec_env = DummyVecEnv([lambda: env])
+    vec_env = env if isinstance(env, VecEnv) else DummyVecEnv([lambda: env])
 
     model = PPO(
         'MlpPolicy',
         vec_env,
         verbose=1,
         policy_kwargs={'net_arch': [256, 128]},
-        batch_size=64
+        batch_size=64,
+        seed=seed
     )
 
+    t0 = time.perf_counter()
     model.learn(total_timesteps=total_timesteps)
+    elapsed = time.perf_counter() - t0
     model.save(model_path)
 
+    print(f"Trained {model.num_timesteps} steps on {vec_env.num_envs} envs in {elapsed:.1f}s "
+          f"({model.num_timesteps / elapsed:,.0f} steps/sec)")
     print(f"Model saved to {model_path}")
     return model
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--data', default='processed/deliveries_processed.parquet')
-    parser.add_argument('--empirical', default='processed/empirical_tables.json')
+    parser.add_argument('--data', default='processed/deliveries_processed.parquet',
+                        help='processed parquet or a delivery store directory')
+    parser.add_argument('--empirical', default='processed/empirical_tables.npz')
+    parser.add_argument('--mappings', default='processed/mappings.json')
     parser.add_argument('--timesteps', type=int, default=200000)
+    parser.add_argument('--n-envs', type=int, default=1)
+    parser.add_argument('--vec-backend', choices=['dummy', 'subproc', 'batched'], default='dummy')
+    parser.add_argument('--seed', type=int, default=0)
     args = parser.parse_args()
 
-    df = pd.read_parquet(args.data)
-
-    sim = EmpiricalSimulator(df, args.empirical)
-    env = CricketEnv(sim)
+    vec_env = build_vec_env(args.vec_backend, args.n_envs, args.data, args.empirical, args.mappings, seed=args.seed)
 
-    train(env, total_timesteps=args.timesteps)
+    train(vec_env, total_timesteps=args.timesteps, seed=args.seed)
+    vec_env.close()
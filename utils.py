@@ -1,17 +1,28 @@
 import os
-import json
-import math
-import random
-from collections import defaultdict, Counter
-
-import numpy as np
-import pandas as pd
-from tqdm import tqdm
 
 
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
+
+def file_version(path):
+    """Cheap identity of a file's contents: name, mtime and size."""
+    st = os.stat(path)
+    return f"{os.path.basename(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
 class SimpleEmbed:
     def __init__(self):
         self.map = {}
@@ -0,0 +1,114 @@
+import numpy as np
+import gymnasium as gym
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from batch_simulator import BatchSimulator
+
+
+class CricketVectorEnv(VecEnv):
+    """
+    K CricketEnv innings stepped together on top of BatchSimulator.
+
+    Observations are stacked (K, 13) arrays laid out like CricketEnv._get_obs.
+    Finished innings are reset automatically; their last observation is returned
+    in info['terminal_observation'] as stable-baselines3 expects.
+    With one_bowler_per_over=True a bowler proposed mid-over is ignored and the
+    bowler chosen at the start of the over keeps bowling, as in CricketEnv.
+    """
+
+    def __init__(self, empirical_json_path, n_envs, mappings_path='processed/mappings.json',
+                 max_balls=120, one_bowler_per_over=False, seed=None):
+        self.sim = BatchSimulator(empirical_json_path, n_envs, mappings_path=mappings_path, seed=seed)
+        self.max_balls = max_balls
+        self.one_bowler_per_over = one_bowler_per_over
+        self.render_mode = None
+
+        observation_space = gym.spaces.Box(
+            low=0, high=200,
+            shape=(5 + 3 + 5,),
+            dtype=np.float32
+        )
+        action_space = gym.spaces.MultiDiscrete([10, 3])
+        super().__init__(n_envs, observation_space, action_space)
+
+        self.last5 = np.zeros((n_envs, 5), dtype=np.float32)
+        self.current_over_bowler = np.full(n_envs, -1, dtype=np.int64)
+        self._actions = None
+
+    def _get_obs(self):
+        return self.sim.observations(self.last5, self.max_balls)
+
+    def _reset_rows(self, idx):
+        self.sim.reset(idx)
+        self.last5[idx] = 0
+        self.current_over_bowler[idx] = -1
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.sim.rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_rows(np.arange(self.num_envs))
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self._actions = np.array(actions, dtype=np.int64).reshape(self.num_envs, -1)
+
+    def step_wait(self):
+        actions = self._actions
+        bowler = actions[:, 0]
+        intent = actions[:, 1] if actions.shape[1] > 1 else np.ones(self.num_envs, dtype=np.int64)
+
+        if self.one_bowler_per_over:
+            new_over = (self.sim.ball == 0) | (self.current_over_bowler < 0)
+            self.current_over_bowler = np.where(new_over, bowler, self.current_over_bowler)
+            bowler = self.current_over_bowler
+        else:
+            self.current_over_bowler = bowler
+
+        outcome = self.sim.step(bowler, intent)
+        runs = outcome['runs']
+        wicket = outcome['wicket']
+
+        self.last5[:, :-1] = self.last5[:, 1:]
+        self.last5[:, -1] = runs
+
+        rewards = (-runs + 6 * wicket + (runs == 0)).astype(np.float32)
+        dones = outcome['match_end']
+        obs = self._get_obs()
+
+        infos = [{} for _ in range(self.num_envs)]
+        done_idx = np.flatnonzero(dones)
+        if len(done_idx):
+            for i in done_idx:
+                infos[i]['terminal_observation'] = obs[i].copy()
+            self._reset_rows(done_idx)
+            obs[done_idx] = self._get_obs()[done_idx]
+
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        self.sim.rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]